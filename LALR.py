@@ -1,138 +1,185 @@
-class LALR:
-    def __init__(self, grammar):
-        self.grammar = grammar
-        self.parsing_table = grammar.action, grammar.goto
+from itertools import count, repeat, tee
+from operator import itemgetter
 
-    def parse(self, tokens):
-        tokens.append('$')
-        action_table, goto_table = self.parsing_table
+from parse_tables import CompactTable, DictTable, LazyTable
+from traversal import preorder
+from trees import DictTreeBuilder, FlatTreeBuilder
 
-        # Initialize parsing stack
-        stack = [0]
-        output = []
-        symbols = []
 
-        i = 0
-        while True:
-            state = stack[-1]
-            symbol = tokens[i]
+class ParseError(Exception):
+    def __init__(self, message, trace=None):
+        super().__init__(message)
+        # Trace records up to and including the failing step, if requested
+        self.trace = trace
 
-            # Look up action
-            if (state, symbol) in action_table:
-                action = action_table[(state, symbol)]
-
-                if action[0] == 'shift':
-                    stack.append(action[1])
-                    symbols.append(symbol)
-                    i += 1
-                    output.append(f"Shift to state {action[1]}")
-
-                elif action[0] == 'reduce':
-                    rule_index = action[1]
-                    lhs, rhs = self.grammar.rules[rule_index]
-
-                    # Pop |rhs| symbols and states
-                    for _ in range(len(rhs)):
-                        stack.pop()
-                        symbols.pop()
-
-                    # Push the LHS non-terminal
-                    state = stack[-1]
-                    symbols.append(lhs)
-
-                    # Special case for the start symbol
-                    if lhs == "P'" and state == 0:
-                        output.append(f"Reduce by {lhs} -> {' '.join(rhs)}")
-                        output.append("Accept")
-                        break
-                    elif (state, lhs) in goto_table:
-                        stack.append(goto_table[(state, lhs)])
-                        output.append(f"Reduce by {lhs} -> {' '.join(rhs)}")
-                    else:
-                        output.append(f"Error: No goto entry for state {state} and symbol {lhs}")
-                        return None, output
-
-                elif action[0] == 'accept':
-                    output.append("Accept")
-                    break
-            else:
-                output.append(f"Error at symbol {symbol}")
-                return None, output
 
-        return symbols, output
+class LALR:
+    def __init__(self, grammar, compact=True):
+        self.grammar = grammar
+        self.parsing_table = grammar.action, grammar.goto
+        # Drivers look actions up through a compiled table; the dict tables
+        # stay on the grammar for print_parse_table. A Grammar(lazy=True)
+        # without cached tables gets a LazyTable that builds states as the
+        # parser reaches them.
+        if grammar.action is None:
+            self.table = LazyTable(grammar)
+        else:
+            self.table = CompactTable(grammar) if compact else DictTable(grammar)
+
+    def warm(self):
+        # Build every state of a lazy table up front; returns the state count
+        if isinstance(self.table, LazyTable):
+            return self.table.warm()
+        return self.grammar.state_count
+
+    def freeze(self):
+        # Finish a lazy table and switch to the packed CompactTable, leaving
+        # the complete dict tables on the grammar as an eager build would
+        if isinstance(self.table, LazyTable):
+            self.table = self.table.freeze()
+            self.parsing_table = self.grammar.action, self.grammar.goto
+        return self
+
+    def run(self, tokens, lexems, trace=False, tree='dict'):
+        # Drive the automaton once, building the parse tree. With trace=True
+        # also record (step, state, action, target) tuples, where target is
+        # the next state for a shift, the rule index for a reduce and the
+        # offending symbol for an error; format_trace renders them.
+        # tree='flat' builds a trees.FlatTree and returns its root view;
+        # tree=None only recognizes the input, as in run_stream.
+        # tokens may be any iterable of token types; it is read one
+        # lookahead at a time and never modified.
+        if tree is None:
+            return self._drive(zip(tokens, repeat(None)), None, trace)
+        types, keys = tee(tokens)
+        pairs = zip(types, map(lexems.get, count(), keys))
+        return self._drive(pairs, self._builder(tree, lexems), trace)
+
+    def run_stream(self, tokens, trace=False, tree='dict'):
+        # Like run, for an iterable of (type, value, ...) tuples such as
+        # tokenizer.iter_tokens yields, so scanning and parsing proceed in
+        # step without a token list. tree=None only recognizes the input:
+        # nothing but the LR stack is kept, and the result is (True, records).
+        builder = self._builder(tree, None) if tree is not None else None
+        return self._drive(map(itemgetter(0, 1), tokens), builder, trace)
+
+    def _builder(self, tree, lexems):
+        if tree == 'flat':
+            return FlatTreeBuilder(self.grammar, lexems)
+        if tree == 'dict':
+            return DictTreeBuilder()
+        raise ValueError(f"Unknown tree layout: {tree}")
+
+    def _drive(self, pairs, builder, trace):
+        # The LR loop over an iterator of (type, value) pairs, pulling the
+        # next pair only when a token is shifted
+        if builder is not None:
+            shift, reduce = builder.shift, builder.reduce
+        else:
+            shift = reduce = None
+
+        table = self.table
+        action, goto = table.action, table.goto
+        rule_lhs, rule_len = table.rule_lhs, table.rule_len
+        terminal_ids = table.terminal_ids
+        rules = self.grammar.rules
+        records = [] if trace else None
 
-    def build_parse_tree(self, tokens, lexems):
-        tokens_copy = tokens.copy()
-        tokens_copy.append('$')
-        action_table, goto_table = self.parsing_table
+        end = ('$', '$')
+        current_token, value = next(pairs, end)
+        symbol_id = terminal_ids.get(current_token)
 
-        # Initialize parsing stack and tree nodes
+        # Initialize parsing stack
         stack = [0]
-        nodes = []
         i = 0
 
         while True:
             state = stack[-1]
-            current_token = tokens_copy[i]
 
             # Look up action
-            if (state, current_token) in action_table:
-                action = action_table[(state, current_token)]
-
-                if action[0] == 'shift':
-                    stack.append(action[1])
-                    # Create leaf node for terminal
-                    node = {
-                        'type': 'terminal',
-                        'symbol': current_token,
-                        'value': lexems.get(i, current_token),
-                        'children': []
-                    }
-                    nodes.append(node)
-                    i += 1
-
-                elif action[0] == 'reduce':
-                    rule_index = action[1]
-                    lhs, rhs = self.grammar.rules[rule_index]
-
-                    # Pop |rhs| symbols and states
-                    children = []
-                    for _ in range(len(rhs)):
-                        stack.pop()
-                        if nodes:  # Check if there are nodes to pop
-                            children.insert(0, nodes.pop())
-
-                    # Create non-terminal node
-                    node = {
-                        'type': 'non-terminal',
-                        'symbol': lhs,
-                        'children': children
-                    }
-                    nodes.append(node)
-
-                    # Push goto state
-                    state = stack[-1]
-
-                    # Special case for the start symbol
-                    if lhs == "P'" and state == 0:
-                        return node  # Return the root of the parse tree
-                    elif (state, lhs) in goto_table:
-                        stack.append(goto_table[(state, lhs)])
-                    else:
-                        error_msg = f"No goto entry for state {state} and symbol {lhs}"
-                        raise Exception(error_msg)
-
-                elif action[0] == 'accept':
-                    return nodes[0]  # Return the root of the parse tree
+            code = action(state, symbol_id) if symbol_id is not None else 0
+
+            if code > 0:
+                stack.append(code - 1)
+                if records is not None:
+                    records.append((len(records) + 1, state, 'shift', code - 1))
+
+                # Create leaf node for terminal
+                if shift is not None:
+                    shift(i, current_token, value)
+                i += 1
+                current_token, value = next(pairs, end)
+                symbol_id = terminal_ids.get(current_token)
+
+            elif code < 0:
+                rule_index = -code - 1
+                lhs = rules[rule_index][0]
+                if records is not None:
+                    records.append((len(records) + 1, state, 'reduce', rule_index))
+
+                # Pop |rhs| states and create the non-terminal node
+                n = rule_len[rule_index]
+                if n:
+                    del stack[-n:]
+                if reduce is not None:
+                    reduce(lhs, n)
+
+                # Push goto state
+                state = stack[-1]
+
+                # Special case for the start symbol
+                if rule_index == 0 and state == 0:
+                    if records is not None:
+                        records.append((len(records) + 1, state, 'accept', None))
+                    # Return the root of the parse tree
+                    return (builder.result() if builder is not None else True), records
+
+                target = goto(state, rule_lhs[rule_index])
+                if target >= 0:
+                    stack.append(target)
+                else:
+                    if records is not None:
+                        records.append((len(records) + 1, state, 'error', lhs))
+                    error_msg = f"No goto entry for state {state} and symbol {lhs}"
+                    raise ParseError(error_msg, records)
             else:
+                if records is not None:
+                    records.append((len(records) + 1, state, 'error', current_token))
                 error_msg = f"Syntax error: unexpected token '{current_token}' at position {i}"
-                raise Exception(error_msg)
+                raise ParseError(error_msg, records)
+
+    def format_trace(self, records):
+        # Render trace records as the step descriptions shown by main.py;
+        # strings are only built as the caller consumes them
+        for _, _, action, target in records:
+            if action == 'shift':
+                yield f"Shift to state {target}"
+            elif action == 'reduce':
+                lhs, rhs = self.grammar.rules[target]
+                yield f"Reduce by {lhs} -> {' '.join(rhs)}"
+            elif action == 'accept':
+                yield "Accept"
+            else:
+                yield f"Error at symbol {target}"
+
+    def parse(self, tokens):
+        # Recognize the tokens and return the formatted step log
+        try:
+            _, records = self.run(tokens, {}, trace=True, tree=None)
+        except ParseError as e:
+            return None, list(self.format_trace(e.trace))
+        # Accepting reduces by rule 0, whose lhs is the root symbol
+        return [self.grammar.rules[0][0]], list(self.format_trace(records))
+
+    def build_parse_tree(self, tokens, lexems):
+        tree, _ = self.run(tokens, lexems)
+        return tree
 
     def print_parse_tree(self, node, depth=0):
-        if node['type'] == 'terminal':
-            value = node['value'] if 'value' in node else node['symbol']
-            print('  ' * depth + f"{node['symbol']}: {value}")
-        else:
-            print('  ' * depth + f"{node['symbol']}")
-            for child in node['children']:
-                self.print_parse_tree(child, depth + 1)
\ No newline at end of file
+        for child, level in preorder(node):
+            indent = '  ' * (depth + level)
+            if child['type'] == 'terminal':
+                value = child['value'] if 'value' in child else child['symbol']
+                print(f"{indent}{child['symbol']}: {value}")
+            else:
+                print(f"{indent}{child['symbol']}")
@@ -0,0 +1,95 @@
+import argparse
+import multiprocessing
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from grammar import Grammar
+from LALR import LALR
+from table_cache import DEFAULT_CACHE_DIR
+from tokenizer import tokenize
+
+# Outcome of parsing one file; tree is only filled in with keep_trees=True
+BatchResult = namedtuple('BatchResult', ['path', 'ok', 'tokens', 'nodes', 'error', 'tree'])
+
+# Parser used by the current process. The parent sets it before the pool
+# starts, so forked workers inherit the tables instead of receiving them
+# with every task.
+_parser = None
+
+
+def _init_worker(cache_dir, method):
+    # Without fork the tables come from the on-disk cache the parent wrote
+    global _parser
+    if _parser is None:
+        _parser = LALR(Grammar(cache_dir=cache_dir, method=method))
+
+
+def load_parser(cache_dir=DEFAULT_CACHE_DIR, method='lr1'):
+    # Build (or load) the tables once and make them this process's parser
+    global _parser
+    _parser = LALR(Grammar(cache_dir=cache_dir, method=method))
+    return _parser
+
+
+def make_pool(workers=None, cache_dir=DEFAULT_CACHE_DIR, method='lr1'):
+    # Process pool whose workers parse with the parser load_parser set up:
+    # inherited through fork where available, else loaded from cache_dir
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=_init_worker, initargs=(cache_dir, method))
+
+
+def _parse_file(path, keep_trees):
+    try:
+        with open(path, encoding='utf-8') as f:
+            code = f.read()
+        tokens, lexems = tokenize(code)
+        tree, _ = _parser.run(tokens, lexems, tree='flat')
+    except Exception as e:
+        return BatchResult(path, False, 0, 0, f"{type(e).__name__}: {e}", None)
+    return BatchResult(path, True, len(tokens), len(tree.tree), None, tree if keep_trees else None)
+
+
+def parse_files(paths, workers=None, cache_dir=DEFAULT_CACHE_DIR, method='lr1', keep_trees=False):
+    # Parse many files, yielding a BatchResult per file in completion order.
+    # workers=None uses one process per CPU; workers=0 parses in this
+    # process, in input order.
+    load_parser(cache_dir, method)
+
+    if workers == 0:
+        for path in paths:
+            yield _parse_file(path, keep_trees)
+        return
+
+    with make_pool(workers, cache_dir, method) as pool:
+        futures = [pool.submit(_parse_file, path, keep_trees) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse many source files in parallel.")
+    arg_parser.add_argument('paths', nargs='+', help="source files to parse")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="worker processes (default: one per CPU, 0: no pool)")
+    arg_parser.add_argument('--method', choices=('lr1', 'lalr'), default='lr1',
+                            help="table construction method")
+    args = arg_parser.parse_args()
+
+    failures = 0
+    for result in parse_files(args.paths, workers=args.workers, method=args.method):
+        if result.ok:
+            print(f"ok     {result.path} ({result.tokens} tokens, {result.nodes} nodes)")
+        else:
+            failures += 1
+            print(f"error  {result.path}: {result.error}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import generate_program
+
+from batch import parse_files
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    directory = tempfile.mkdtemp(prefix='batch-bench-')
+    try:
+        paths = []
+        for k in range(files):
+            path = os.path.join(directory, f"prog{k}.src")
+            with open(path, 'w') as f:
+                f.write(generate_program(statements + k % 7))
+            paths.append(path)
+
+        counts = [0, 1, 2, 4, 8, 16]
+        counts = [n for n in counts if n <= (os.cpu_count() or 1)] or [0, 1]
+        print(f"{files} files x ~{statements} statements, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8}{'seconds':>10}{'files/s':>10}{'speedup':>9}")
+        baseline = None
+        for workers in counts:
+            start = time.perf_counter()
+            results = list(parse_files(paths, workers=workers))
+            elapsed = time.perf_counter() - start
+            assert all(result.ok for result in results)
+            baseline = baseline or elapsed
+            label = 'inline' if workers == 0 else str(workers)
+            print(f"{label:>8}{elapsed:>10.2f}{files / elapsed:>10.1f}{baseline / elapsed:>9.2f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT, best_of, generate_program
+
+from codegen import write_module
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location('generated_parser', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def same_tree(a, b):
+    # Structural equality, iterative since the trees are deep
+    pending = [(a, b)]
+    while pending:
+        x, y = pending.pop()
+        if (x['type'], x['symbol'], x.get('value')) != (y['type'], y['symbol'], y.get('value')):
+            return False
+        if len(x['children']) != len(y['children']):
+            return False
+        pending.extend(zip(x['children'], y['children']))
+    return True
+
+
+def startup(code):
+    # Best wall time of a fresh interpreter running `code`
+    def run():
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+    return best_of(run, repeat=5)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    directory = tempfile.mkdtemp(prefix='codegen-bench-')
+    try:
+        path = os.path.join(directory, 'generated_parser.py')
+        grammar = Grammar()
+        write_module(grammar, path)
+        generated = load_module(path)
+        parser = LALR(grammar)
+
+        print(f"{'statements':>11}{'tokens':>9}{'LALR ms':>10}{'generated ms':>14}{'speedup':>9}")
+        for statements in sizes:
+            tokens, lexems = tokenize(generate_program(statements))
+            assert same_tree(parser.build_parse_tree(tokens, lexems), generated.parse(tokens, lexems))
+            generic = best_of(lambda: parser.run(tokens, lexems))
+            specialized = best_of(lambda: generated.parse(tokens, lexems))
+            print(f"{statements:>11}{len(tokens):>9}{generic * 1000:>10.1f}"
+                  f"{specialized * 1000:>14.1f}{generic / specialized:>9.2f}")
+
+        # Startup: building the tables against importing the generated module
+        # (compiled to bytecode on the first import)
+        build = startup("from grammar import Grammar; from LALR import LALR; LALR(Grammar())")
+        startup(f"import sys; sys.path.insert(0, {directory!r}); import generated_parser")
+        imported = startup(f"import sys; sys.path.insert(0, {directory!r}); import generated_parser")
+        print()
+        print(f"startup with table construction  {build * 1000:8.1f} ms")
+        print(f"startup importing the module     {imported * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import sys
+import tempfile
+
+from common import best_of, generate_program
+
+from compiler import CodeCache, Program, compile_tree
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+
+def block_statements(block):
+    items = []
+    while len(block['children']) == 2:
+        items.append(block['children'][1])
+        block = block['children'][0]
+    items.append(block['children'][0])
+    return items[::-1]
+
+
+def evaluate(tree, argument, write):
+    # Reference tree-walking evaluator with the semantics of compiler.py:
+    # returns the parameter's final value and the global variables
+    node = tree
+    while node['symbol'] != 'P':
+        node = node['children'][0]
+    decl, proc = node['children']
+    variables = {decl['children'][0]['value']: 0}
+    children = proc['children']
+    param = children[3]['children'][0]['value']
+    frame = {param: argument}
+
+    def lookup(name):
+        if name == param or name not in variables:
+            return frame.get(name, 0)
+        return variables[name]
+
+    def holds(condition):
+        for comparison in (condition['children'][0], condition['children'][2]):
+            name, _, number = comparison['children']
+            if lookup(name['value']) != int(number['value']):
+                return False
+        return True
+
+    pending = block_statements(children[5])[::-1]
+    while pending:
+        statement = pending.pop()['children'][0]
+        parts = statement['children']
+        if statement['symbol'] == 'A':
+            name = parts[0]['value']
+            scope = frame if name == param or name not in variables else variables
+            scope[name] = int(parts[2]['value'])
+        elif statement['symbol'] == 'F':
+            write(parts[2]['value'][1:-1])
+        elif holds(parts[1]):
+            pending.extend(block_statements(parts[3])[::-1])
+        elif holds(parts[5]):
+            pending.extend(block_statements(parts[7])[::-1])
+        else:
+            pending.extend(block_statements(parts[9])[::-1])
+    return frame[param], variables
+
+
+def discard(text):
+    pass
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    parser = LALR(Grammar())
+    arguments = range(20)
+
+    print(f"{'statements':>11}{'nesting':>9}{'walk ms':>10}{'compiled ms':>13}{'speedup':>9}"
+          f"{'compile ms':>12}{'disk hit ms':>13}{'memory hit us':>15}")
+    for statements in sizes:
+        for nesting in (1, 4):
+            source = generate_program(statements, nesting=nesting)
+            tokens, lexems = tokenize(source)
+            tree = parser.build_parse_tree(tokens, lexems)
+            code = compile_tree(tree)
+
+            # Both must print the same text and end in the same state
+            for argument in arguments:
+                walked, compiled = [], []
+                result = evaluate(tree, argument, walked.append)
+                program = Program(code, write=compiled.append)
+                assert result == (program.call(program.procedures[0], argument), program.variables)
+                assert walked == compiled
+
+            program = Program(code, write=discard)
+            procedure = program.procedures[0]
+            walk = best_of(lambda: [evaluate(tree, a, discard) for a in arguments], repeat=3)
+            run = best_of(lambda: [program.call(procedure, a) for a in arguments], repeat=3)
+
+            # Cold compile (parse + lower + compile), a new cache loading it
+            # from disk, and a hit in the same cache
+            with tempfile.TemporaryDirectory() as cache_dir:
+                cold = best_of(lambda: CodeCache(parser).get(source), repeat=1)
+                CodeCache(parser, cache_dir).get(source)
+                disk = best_of(lambda: CodeCache(parser, cache_dir).get(source), repeat=3)
+                cache = CodeCache(parser)
+                cache.get(source)
+                memory = best_of(lambda: cache.get(source), repeat=5)
+
+            calls = len(arguments)
+            print(f"{statements:>11}{nesting:>9}{walk / calls * 1000:>10.3f}{run / calls * 1000:>13.3f}"
+                  f"{walk / run:>9.1f}{cold * 1000:>12.1f}{disk * 1000:>13.2f}{memory * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
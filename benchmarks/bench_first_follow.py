@@ -0,0 +1,106 @@
+import sys
+
+from common import best_of
+from grammars import synthetic_grammar
+
+from grammar import Grammar
+
+
+def legacy_first_sets(grammar):
+    # The previous FIRST computation: rescan every rule until nothing
+    # changes, with set arithmetic in the inner loop
+    first = {symbol: set() for symbol in grammar.terminals | grammar.non_terminals}
+    for terminal in grammar.terminals:
+        first[terminal] = {terminal}
+
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in grammar.rules:
+            if not rhs:
+                if '' not in first[lhs]:
+                    first[lhs].add('')
+                    changed = True
+            else:
+                all_nullable = True
+                for symbol in rhs:
+                    first_symbol = first[symbol] - {''}
+                    if first_symbol - first[lhs]:
+                        first[lhs] |= first_symbol
+                        changed = True
+                    if '' not in first[symbol]:
+                        all_nullable = False
+                        break
+                if all_nullable and '' not in first[lhs]:
+                    first[lhs].add('')
+                    changed = True
+    return first
+
+
+def legacy_follow_sets(grammar, first):
+    follow = {nt: set() for nt in grammar.non_terminals}
+    follow[grammar.start] = {'$'}
+
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in grammar.rules:
+            for i, symbol in enumerate(rhs):
+                if symbol in grammar.non_terminals:
+                    first_beta = set()
+                    nullable_beta = True
+                    for beta in rhs[i + 1:]:
+                        first_beta |= first[beta] - {''}
+                        if '' not in first[beta]:
+                            nullable_beta = False
+                            break
+                    if first_beta - follow[symbol]:
+                        follow[symbol] |= first_beta
+                        changed = True
+                    if nullable_beta or i == len(rhs) - 1:
+                        if follow[lhs] - follow[symbol]:
+                            follow[symbol] |= follow[lhs]
+                            changed = True
+    return follow
+
+
+def with_empty_statements(rules):
+    # Add nullable productions so that FIRST and FOLLOW have to flow
+    # through '' as well
+    return rules + [("Stmt", []), ("E0", [])]
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 5000]
+    print(f"{'rules':>7}{'nullable':>10}{'bitset ms':>11}{'legacy ms':>11}{'speedup':>9}")
+    for size in sizes:
+        rules, terminals, non_terminals = synthetic_grammar(size)
+        for nullable in (False, True):
+            if nullable:
+                rules = with_empty_statements(rules)
+            # Only the symbol sets are needed; the tables are not built
+            grammar = Grammar.__new__(Grammar)
+            grammar.rules = rules
+            grammar.terminals = set(terminals)
+            grammar.non_terminals = set(non_terminals)
+            grammar.start = rules[0][0]
+
+            def bitsets():
+                grammar.compute_first_sets()
+                grammar.compute_follow_sets()
+
+            def legacy():
+                return legacy_follow_sets(grammar, legacy_first_sets(grammar))
+
+            bitset_time = best_of(bitsets, repeat=3)
+            legacy_time = best_of(legacy, repeat=1)
+
+            first = legacy_first_sets(grammar)
+            assert dict(grammar.first) == first
+            assert dict(grammar.follow) == legacy_follow_sets(grammar, first)
+            print(f"{len(rules):>7}{str(nullable):>10}{bitset_time * 1000:>11.1f}"
+                  f"{legacy_time * 1000:>11.1f}{legacy_time / bitset_time:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
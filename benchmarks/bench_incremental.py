@@ -0,0 +1,92 @@
+import sys
+
+from common import best_of, generate_program
+
+from grammar import Grammar
+from incremental import IncrementalParser
+from LALR import LALR
+
+
+def same_tree(a, b):
+    # Structural equality, iterative since the trees are deep
+    pending = [(a, b)]
+    while pending:
+        x, y = pending.pop()
+        if x is y:
+            continue
+        if (x['symbol'], x.get('value'), x['ntok']) != (y['symbol'], y.get('value'), y['ntok']):
+            return False
+        if len(x['children']) != len(y['children']):
+            return False
+        pending.extend(zip(x['children'], y['children']))
+    return True
+
+
+def count_nodes(tree):
+    pending = [tree]
+    count = 0
+    while pending:
+        node = pending.pop()
+        count += 1
+        pending.extend(node['children'])
+    return count
+
+
+def shared_nodes(old, new):
+    # Nodes of the new tree taken unchanged from the old one
+    old_ids = set()
+    pending = [old]
+    while pending:
+        node = pending.pop()
+        old_ids.add(id(node))
+        pending.extend(node['children'])
+    shared = 0
+    pending = [new]
+    while pending:
+        node = pending.pop()
+        if id(node) in old_ids:
+            shared += count_nodes(node)
+        else:
+            pending.extend(node['children'])
+    return shared
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sys.setrecursionlimit(10000)
+
+    parser = IncrementalParser(LALR(Grammar()))
+    text = generate_program(statements)
+    doc = parser.parse(text)
+    middle = text.index("\nv := ", len(text) // 2) + 1
+
+    # Single-line edits in the middle of the file: (description, offset,
+    # deleted, inserted)
+    number = middle + len("v := ")
+    if_number = text.index("If v = ", middle) + len("If v = ")
+    edits = [
+        ("change a number", number, 1, "7"),
+        ("insert a statement", middle, 0, "v := 5;\n"),
+        ("delete a statement", middle, text.index("\n", middle) + 1 - middle, ""),
+        ("edit an if condition", if_number, 1, "42"),
+    ]
+
+    print(f"{statements} statements, {len(text)} chars, {len(doc.types)} tokens, "
+          f"{count_nodes(doc.tree)} nodes")
+    full_time = best_of(lambda: parser.parse(text), repeat=3)
+    print(f"{'full parse':<22}{full_time * 1000:>10.1f} ms")
+
+    for name, offset, deleted, inserted in edits:
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        expected = parser.parse(new_text).tree
+        updated = parser.reparse(doc, offset, deleted, inserted)
+        assert same_tree(updated.tree, expected), name
+
+        elapsed = best_of(lambda: parser.reparse(doc, offset, deleted, inserted), repeat=3)
+        reused = shared_nodes(doc.tree, updated.tree) / count_nodes(updated.tree)
+        print(f"{name:<22}{elapsed * 1000:>10.1f} ms{full_time / elapsed:>8.1f}x"
+              f"  ({reused:.1%} of nodes reused)")
+
+
+if __name__ == "__main__":
+    main()
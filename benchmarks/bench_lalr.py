@@ -0,0 +1,16 @@
+from common import best_of
+
+from grammar import Grammar
+
+
+def main():
+    print(f"{'method':<8}{'states':>8}{'actions':>10}{'gotos':>8}{'build ms':>11}")
+    for method in ('lr1', 'lalr'):
+        grammar = Grammar(method=method)
+        build_time = best_of(lambda: Grammar(method=method))
+        print(f"{method:<8}{grammar.state_count:>8}{len(grammar.action):>10}"
+              f"{len(grammar.goto):>8}{build_time * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
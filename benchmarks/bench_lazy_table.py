@@ -0,0 +1,63 @@
+import sys
+import time
+
+from common import best_of, generate_program
+from grammars import synthetic_grammar
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+
+def synthetic_input(kinds, statements):
+    # Token types for the synthetic grammar using only the first `kinds`
+    # statement kinds and the lowest precedence level
+    tokens = []
+    for k in range(statements):
+        tokens += [f"kw{k % kinds}", "id", "op0", "id", "semi"]
+    return tokens
+
+
+def first_parse(make_grammar, tokens, lazy):
+    # Seconds from nothing to the first parse tree, and the parser
+    start = time.perf_counter()
+    parser = LALR(make_grammar(lazy))
+    parser.run(tokens, {})
+    return time.perf_counter() - start, parser
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 200, 400]
+    cases = [("built-in", lambda lazy: Grammar(lazy=lazy), tokenize(generate_program(1000))[0])]
+    for size in sizes:
+        rules, terminals, non_terminals = synthetic_grammar(size)
+
+        def make(lazy, rules=rules, terminals=terminals, non_terminals=non_terminals):
+            return Grammar(rules=rules, terminals=terminals, non_terminals=non_terminals, lazy=lazy)
+        # Small grammars define fewer than 10 statement kinds
+        kinds = sum(1 for term in terminals if term.startswith('kw'))
+        for used in sorted({min(2, kinds), min(10, kinds)}):
+            cases.append((f"synthetic {size}, {used} kinds", make, synthetic_input(used, 1000)))
+
+    print(f"{'grammar / input':<28}{'states':>8}{'eager ms':>10}{'lazy ms':>10}{'built':>8}"
+          f"{'warm ms':>9}{'parse x':>9}")
+    for name, make, tokens in cases:
+        eager_time, eager = first_parse(make, tokens, lazy=False)
+        lazy_time, lazy = first_parse(make, tokens, lazy=True)
+        built = lazy.table.materialized / eager.grammar.state_count
+
+        # Steady state: dict rows of the lazy table against the packed table
+        lazy_parse = best_of(lambda: lazy.run(tokens, {}), repeat=3)
+        eager_parse = best_of(lambda: eager.run(tokens, {}), repeat=3)
+
+        start = time.perf_counter()
+        lazy.warm()
+        warm_time = time.perf_counter() - start
+        assert lazy.table.state_count == eager.grammar.state_count
+
+        print(f"{name:<28}{eager.grammar.state_count:>8}{eager_time * 1000:>10.1f}{lazy_time * 1000:>10.1f}"
+              f"{built:>8.1%}{warm_time * 1000:>9.1f}{lazy_parse / eager_parse:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
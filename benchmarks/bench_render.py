@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from render_cache import RenderCache, render_many
+from tokenizer import tokenize
+from visualizer import write_dot
+
+
+def timed(jobs, workers, cache):
+    start = time.perf_counter()
+    results = list(render_many(jobs, workers=workers, cache=cache))
+    assert all(result.ok for result in results), [r.error for r in results if not r.ok]
+    return time.perf_counter() - start
+
+
+def main():
+    trees = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    statements = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    if shutil.which('dot') is None:
+        print("Graphviz 'dot' not found on PATH")
+        sys.exit(1)
+
+    parser = LALR(Grammar())
+    directory = tempfile.mkdtemp(prefix='render-bench-')
+    try:
+        # Distinct trees, so nothing is shared between jobs
+        jobs = []
+        for k in range(trees):
+            tokens, lexems = tokenize(generate_program(statements + k))
+            dot_path = os.path.join(directory, f"tree{k}.dot")
+            write_dot(parser.build_parse_tree(tokens, lexems), dot_path)
+            jobs.append((dot_path, os.path.join(directory, f"tree{k}.png")))
+
+        cache = RenderCache(os.path.join(directory, 'cache'))
+        workers = os.cpu_count() or 1
+        print(f"{trees} trees of {statements}+ statements, {workers} CPUs")
+        print(f"sequential, no cache   {timed(jobs, 1, None):8.2f} s")
+        print(f"{workers} workers, no cache    {timed(jobs, workers, None):8.2f} s")
+        print(f"{workers} workers, cold cache  {timed(jobs, workers, cache):8.2f} s")
+        print(f"{workers} workers, warm cache  {timed(jobs, workers, cache):8.2f} s")
+        print(f"cache size             {cache.size() / 1e6:8.2f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import shutil
+import tempfile
+
+from common import best_of
+
+from grammar import Grammar
+from table_cache import cache_path
+
+
+def main():
+    cache_dir = tempfile.mkdtemp(prefix='lr-cache-')
+    try:
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            Grammar(cache_dir=cache_dir)
+
+        def warm():
+            Grammar(cache_dir=cache_dir)
+
+        no_cache = best_of(Grammar)
+        cold_time = best_of(cold)
+        warm()  # make sure an entry exists
+        warm_time = best_of(warm, repeat=20)
+
+        print(f"cache file : {cache_path(Grammar(cache_dir=cache_dir), cache_dir)}")
+        print(f"no cache   : {no_cache * 1000:8.2f} ms")
+        print(f"cold start : {cold_time * 1000:8.2f} ms (build + write)")
+        print(f"warm start : {warm_time * 1000:8.2f} ms (load)")
+        print(f"speedup    : {cold_time / warm_time:8.1f}x")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
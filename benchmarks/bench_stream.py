@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import iter_file_tokens, tokenize
+
+
+def list_pipeline(parser, path, tree):
+    with open(path, encoding='utf-8') as f:
+        tokens, lexems = tokenize(f.read())
+    return parser.run(tokens, lexems, tree=tree)[0]
+
+
+def stream_pipeline(parser, path, tree):
+    return parser.run_stream(iter_file_tokens(path), tree=tree)[0]
+
+
+def measure(fn):
+    # Wall time untraced, then peak traced memory in a second run
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        fn()
+        return elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    parser = LALR(Grammar())
+
+    fd, path = tempfile.mkstemp(suffix='.src')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(generate_program(statements))
+        print(f"{statements} statements, {os.path.getsize(path):,} bytes")
+        print(f"{'pipeline':<28}{'seconds':>9}{'peak MB':>10}")
+
+        cases = [
+            ("tokenize + run (dict)", lambda: list_pipeline(parser, path, 'dict')),
+            ("run_stream (dict)", lambda: stream_pipeline(parser, path, 'dict')),
+            ("tokenize + run (flat)", lambda: list_pipeline(parser, path, 'flat')),
+            ("run_stream (flat)", lambda: stream_pipeline(parser, path, 'flat')),
+            ("run_stream recognizer", lambda: stream_pipeline(parser, path, None)),
+        ]
+        for name, fn in cases:
+            elapsed, peak = measure(fn)
+            print(f"{name:<28}{elapsed:>9.2f}{peak / 1e6:>10.1f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import time
+
+from common import best_of
+from grammars import synthetic_grammar
+
+from grammar import Grammar
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [25, 50, 100, 200, 400]
+
+    print(f"{'size':>6}{'rules':>7}{'method':>8}{'states':>8}{'build ms':>11}")
+    for size in sizes:
+        rules, terminals, non_terminals = synthetic_grammar(size)
+        for method in ('lr1', 'lalr'):
+            def build():
+                return Grammar(method=method, rules=rules,
+                               terminals=terminals, non_terminals=non_terminals)
+
+            start = time.perf_counter()
+            grammar = build()
+            elapsed = time.perf_counter() - start
+            if elapsed < 1.0:
+                elapsed = min(elapsed, best_of(build, repeat=3))
+            print(f"{size:>6}{len(rules):>7}{method:>8}{grammar.state_count:>8}{elapsed * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
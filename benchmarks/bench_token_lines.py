@@ -0,0 +1,80 @@
+import sys
+from contextlib import redirect_stdout
+
+from common import best_of, generate_program
+
+from main import display_tokens_by_line
+from tokenizer import LineIndex, tokenize_with_offsets
+
+
+class NullSink:
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def legacy_tokens_by_line(code, tokens, lexems):
+    # The previous report: a token belongs to the current line while its
+    # lexeme occurs anywhere in that line's text
+    lines = code.strip().split('\n')
+    token_index = 0
+    lexeme_items = list(lexems.items())
+
+    print("\nFormatted Tokens & Lexemes Per Line:\n")
+
+    for line_num, line in enumerate(lines):
+        print(f"Code Line {line_num+1}: {line.strip()}")
+
+        token_line = []
+        lexeme_line = []
+
+        while token_index < len(lexeme_items):
+            _, lexeme = lexeme_items[token_index]
+
+            if lexeme in line:
+                token_line.append(tokens[token_index])
+                lexeme_line.append(lexeme)
+                token_index += 1
+            else:
+                break
+
+        print(f"  Tokens : {' '.join(token_line)}")
+        print(f"  Lexems : {' | '.join(lexeme_line)}\n")
+
+
+def legacy_lines(code, lexems):
+    # Line number the legacy report gives each token
+    lines = code.strip().split('\n')
+    values = list(lexems.values())
+    assigned = []
+    for line_num, line in enumerate(lines):
+        while len(assigned) < len(values) and values[len(assigned)] in line:
+            assigned.append(line_num + 1)
+    return assigned
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    print(f"{'statements':>11}{'lines':>9}{'index ms':>10}{'report ms':>11}{'legacy ms':>11}"
+          f"{'legacy misplaced':>18}")
+    for statements in sizes:
+        # Long string literals make for long lines
+        code = generate_program(statements, string_len=200)
+        tokens, lexems, offsets = tokenize_with_offsets(code)
+
+        index_time = best_of(lambda: LineIndex(code), repeat=3)
+        with redirect_stdout(NullSink()):
+            report_time = best_of(lambda: display_tokens_by_line(code, tokens, lexems, offsets), repeat=3)
+            legacy_time = best_of(lambda: legacy_tokens_by_line(code, tokens, lexems), repeat=3)
+
+        index = LineIndex(code)
+        misplaced = sum(1 for offset, line in zip(offsets, legacy_lines(code, lexems))
+                        if index.line(offset) != line)
+        print(f"{statements:>11}{len(index):>9}{index_time * 1000:>10.1f}"
+              f"{report_time * 1000:>11.1f}{legacy_time * 1000:>11.1f}{misplaced:>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import gc
+import sys
+import tracemalloc
+
+from common import best_of, generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize, tokenize_stream
+
+
+def retained(fn):
+    # Bytes still allocated by fn's result once it returns
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    parser = LALR(Grammar())
+
+    print(f"{'statements':>11}{'tokens':>10}{'':>3}{'B/token':>9}{'scan ms':>9}{'parse ms':>10}")
+    for statements in sizes:
+        code = generate_program(statements)
+        encoded = code.encode()
+        tokens, lexems = tokenize(code)
+        stream = tokenize_stream(code)
+        assert list(stream) == tokens and dict(stream.lexemes) == lexems
+
+        cases = [
+            ("list", lambda: tokenize(code), lambda t: parser.run(t[0], t[1], tree='flat')),
+            ("stream", lambda: tokenize_stream(code), lambda t: parser.run(t, t.lexemes, tree='flat')),
+            ("bytes", lambda: tokenize_stream(encoded), lambda t: parser.run(t, t.lexemes, tree='flat')),
+        ]
+        for name, scan, parse in cases:
+            size, result = retained(scan)
+            scan_time = best_of(scan, repeat=3)
+            parse_time = best_of(lambda result=result: parse(result), repeat=3)
+            print(f"{statements:>11}{len(tokens):>10}   {name:<7}{size / len(tokens):>9.1f}"
+                  f"{scan_time * 1000:>9.1f}{parse_time * 1000:>10.1f}")
+            del result
+
+
+if __name__ == "__main__":
+    main()
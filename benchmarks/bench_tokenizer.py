@@ -0,0 +1,60 @@
+import re
+import sys
+
+from common import best_of, generate_program
+
+from tokenizer import tokenize
+
+
+def legacy_tokenize(pseudocode):
+    # The previous scanner: an ordered alternation rebuilt on every call,
+    # trying each keyword before falling back to identifiers
+    token_specification = [
+        ('procedure', r'[Pp]rocedure'),
+        ('if', r'[Ii]f'),
+        ('then', r'then'),
+        ('elseif', r'[Ee]lseif'),
+        ('else', r'else'),
+        ('end', r'end'),
+        ('integer', r'integer'),
+        ('printf', r'printf'),
+        ('and', r'and'),
+        ('ASSIGN', r':='),
+        ('COLON', r':'),
+        ('SEMI', r';'),
+        ('LPAREN', r'\('),
+        ('RPAREN', r'\)'),
+        ('EQ', r'='),
+        ('id', r'[a-zA-Z_][a-zA-Z_0-9]*'),
+        ('num', r'\d+'),
+        ('str', r'"[^"]*"'),
+        ('WHITESPACE', r'[ \t\n]+'),
+    ]
+    tok_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification)
+    tokens = []
+    lexems = {}
+
+    for mo in re.finditer(tok_regex, pseudocode):
+        token_type = mo.lastgroup
+        value = mo.group()
+        if token_type != 'WHITESPACE':
+            tokens.append(token_type)
+            lexems[len(tokens) - 1] = value
+
+    return tokens, lexems
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+
+    print(f"{'statements':>11}{'tokens':>10}{'legacy tok/s':>15}{'current tok/s':>15}")
+    for statements in sizes:
+        code = generate_program(statements)
+        count = len(tokenize(code)[0])
+        legacy = best_of(lambda: legacy_tokenize(code), repeat=3)
+        current = best_of(lambda: tokenize(code), repeat=3)
+        print(f"{statements:>11}{count:>10}{count / legacy:>15,.0f}{count / current:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+import time
+from contextlib import redirect_stdout
+
+from common import generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+from traversal import Visitor, level_order, postorder, preorder
+
+
+class SymbolCounter(Visitor):
+    def __init__(self):
+        super().__init__()
+        self.statements = 0
+        self.terminals = 0
+
+    def visit_St(self, node, depth):
+        self.statements += 1
+
+    def generic_visit(self, node, depth):
+        if node['type'] == 'terminal':
+            self.terminals += 1
+
+
+class CountingSink:
+    # Stands in for stdout, keeping only the number of characters written
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+    def flush(self):
+        pass
+
+
+def recursive_count(node):
+    # The recursive walk the traversal module replaces
+    return 1 + sum(recursive_count(child) for child in node['children'])
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22}{elapsed:>9.2f} s  {result}")
+
+
+def main():
+    # About 22 nodes per statement, so the default is just over 10^6 nodes
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 46000
+    parser = LALR(Grammar())
+    tokens, lexems = tokenize(generate_program(statements))
+
+    for layout in ('dict', 'flat'):
+        tree, _ = parser.run(tokens, lexems, tree=layout)
+        nodes = sum(1 for _ in preorder(tree))
+        depth = max(d for _, d in preorder(tree))
+        print(f"{layout} tree: {nodes:,} nodes, depth {depth:,}")
+
+        timed("preorder", lambda: sum(1 for _ in preorder(tree)))
+        timed("postorder", lambda: sum(1 for _ in postorder(tree)))
+        timed("level_order", lambda: sum(1 for _ in level_order(tree)))
+
+        def visit():
+            counter = SymbolCounter()
+            counter.walk(tree)
+            return f"{counter.statements} statements, {counter.terminals} terminals"
+        timed("Visitor", visit)
+
+        # Indentation makes the printed size quadratic in the depth, so
+        # print the tree of a program a tenth of the size
+        small, _ = parser.run(*tokenize(generate_program(statements // 10)), tree=layout)
+
+        def print_tree():
+            out = CountingSink()
+            with redirect_stdout(out):
+                parser.print_parse_tree(small)
+            return f"{out.chars:,} chars for {statements // 10} statements"
+        timed("print_parse_tree", print_tree)
+
+        try:
+            timed("recursive walk", lambda: recursive_count(tree))
+        except RecursionError:
+            print(f"{'recursive walk':<22}{'RecursionError':>11}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
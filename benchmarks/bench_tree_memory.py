@@ -0,0 +1,38 @@
+import sys
+import time
+import tracemalloc
+
+from common import generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+
+def measure(parser, tokens, lexems, layout):
+    # Memory retained by the finished tree and peak memory while building
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree, _ = parser.run(tokens, lexems, tree=layout)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return current, peak, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 50000]
+    parser = LALR(Grammar())
+
+    print(f"{'statements':>11}{'tokens':>9}{'layout':>8}{'retained':>12}{'peak':>12}{'B/token':>9}{'ms':>9}")
+    for statements in sizes:
+        tokens, lexems = tokenize(generate_program(statements))
+        for layout in ('dict', 'flat'):
+            current, peak, elapsed = measure(parser, tokens, lexems, layout)
+            print(f"{statements:>11}{len(tokens):>9}{layout:>8}{current:>12,}{peak:>12,}"
+                  f"{current / len(tokens):>9.1f}{elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+
+from common import best_of, generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+from treefile import TreeReader, load_tree, write_json, write_tree
+
+
+def deep(fn):
+    # pickle and json recurse once per tree level, and the S -> S St chain
+    # is as deep as the program is long, so run them on a thread with a
+    # large stack and recursion limit
+    result = []
+    limit = sys.getrecursionlimit()
+    old_size = threading.stack_size(512 * 1024 * 1024)
+    sys.setrecursionlimit(10 ** 6)
+    try:
+        thread = threading.Thread(target=lambda: result.append(fn()))
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(old_size)
+        sys.setrecursionlimit(limit)
+    return result[0]
+
+
+def last_statement(root):
+    # Kind of the procedure's last statement; touches a handful of nodes,
+    # where a full load decodes all of them
+    block = root['children'][0]['children'][1]['children'][5]
+    return block['children'][-1]['children'][0]['symbol']
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    parser = LALR(Grammar())
+    directory = tempfile.mkdtemp(prefix='treefile-bench-')
+    try:
+        print(f"{'statements':>11}{'nodes':>9}  {'format':<8}{'bytes':>12}{'write ms':>10}"
+              f"{'load ms':>10}{'open+last ms':>14}")
+        for statements in sizes:
+            tokens, lexems = tokenize(generate_program(statements))
+            tree, _ = parser.run(tokens, lexems)
+            flat, _ = parser.run(tokens, lexems, tree='flat')
+            nodes = len(flat.tree)
+
+            binary = os.path.join(directory, 'tree.lrpt')
+            pickled = os.path.join(directory, 'tree.pickle')
+            exported = os.path.join(directory, 'tree.json')
+
+            def save_pickle():
+                with open(pickled, 'wb') as f:
+                    pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            def load_pickle():
+                with open(pickled, 'rb') as f:
+                    return pickle.load(f)
+
+            def save_json():
+                with open(exported, 'w', encoding='utf-8') as f:
+                    write_json(tree, f)
+
+            def load_json():
+                with open(exported, encoding='utf-8') as f:
+                    return json.load(f)
+
+            def open_binary():
+                with TreeReader(binary) as reader:
+                    return last_statement(reader.root)
+
+            rows = [
+                ("binary", binary, lambda: write_tree(tree, binary), lambda: load_tree(binary), open_binary),
+                ("pickle", pickled, lambda: deep(save_pickle), lambda: deep(load_pickle), None),
+                ("json", exported, save_json, lambda: deep(load_json), None),
+            ]
+            for name, path, save, load, lazy in rows:
+                write_time = best_of(save, repeat=3)
+                load_time = best_of(load, repeat=3)
+                lazy_text = f"{best_of(lazy) * 1000:>14.2f}" if lazy else f"{'-':>14}"
+                print(f"{statements:>11}{nodes:>9}  {name:<8}{os.path.getsize(path):>12,}"
+                      f"{write_time * 1000:>10.1f}{load_time * 1000:>10.1f}{lazy_text}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import random
+import string
+import sys
+import time
+
+# Benchmarks are run as scripts (python benchmarks/bench_x.py), so make the
+# project modules importable from here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from tokenizer import KEYWORDS  # noqa: E402
+
+
+def best_of(fn, repeat=5):
+    # Best wall time of several runs, in seconds
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _identifier(rng, length):
+    # Lowercase identifiers starting with 'v', which no keyword does
+    while True:
+        name = 'v' + ''.join(rng.choice(string.ascii_lowercase) for _ in range(length - 1))
+        if name not in KEYWORDS:
+            return name
+
+
+def generate_program(statements=100, if_blocks=None, nesting=1, ident_len=1,
+                     string_len=10, seed=0):
+    # A valid program for the built-in grammar. The procedure body S has
+    # `statements` statements, `if_blocks` of which (default a third) are
+    # if/elseif/else blocks; each branch of a block holds one statement, or
+    # another block while fewer than `nesting` levels are open. Identifiers
+    # are `ident_len` characters and printf strings `string_len` characters
+    # between the quotes. The output is deterministic for a given seed.
+    rng = random.Random(seed)
+    statements = max(1, statements)
+    if if_blocks is None:
+        if_blocks = statements // 3
+    if_blocks = min(if_blocks, statements)
+    ident_len = max(1, ident_len)
+
+    names = [_identifier(rng, ident_len) for _ in range(16)]
+    text = ''.join(rng.choice(string.ascii_letters + ' ') for _ in range(string_len))
+
+    def simple(indent):
+        if rng.random() < 0.5:
+            return [f'{indent}{rng.choice(names)} := {rng.randrange(1000)};']
+        return [f'{indent}printf( "{text}" );']
+
+    def condition():
+        return (f"{rng.choice(names)} = {rng.randrange(100)} and "
+                f"{rng.choice(names)} = {rng.randrange(100)}")
+
+    def block(indent, depth):
+        # Open all levels, then close them innermost first, so deep nesting
+        # does not recurse
+        lines = []
+        inner = indent
+        for _ in range(depth):
+            lines.append(f"{inner}If {condition()} then")
+            inner += '    '
+        lines.extend(simple(inner))
+        for level in reversed(range(depth)):
+            inner = indent + '    ' * level
+            lines.append(f"{inner}elseif {condition()} then")
+            lines.extend(simple(inner + '    '))
+            lines.append(f"{inner}else")
+            lines.extend(simple(inner + '    '))
+            lines.append(f"{inner}end if;")
+        return lines
+
+    # Place the blocks at random positions in the body (fixed by the seed)
+    kinds = [True] * if_blocks + [False] * (statements - if_blocks)
+    rng.shuffle(kinds)
+
+    proc = _identifier(rng, ident_len)
+    lines = [f"{names[0]}: integer ;", f"Procedure {proc}( {names[1]} : integer )"]
+    for is_block in kinds:
+        if is_block:
+            lines.extend(block('', max(1, nesting)))
+        else:
+            lines.extend(simple(''))
+    lines.append(f"end {proc}")
+    return "\n".join(lines)
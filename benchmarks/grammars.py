@@ -0,0 +1,31 @@
+def synthetic_grammar(size):
+    # Build a grammar with roughly `size` productions: a statement list over
+    # many statement kinds plus an expression ladder with `size // 20`
+    # precedence levels. Returns (rules, terminals, non_terminals).
+    levels = max(1, size // 20)
+    kinds = max(1, (size - 2 * levels) // 2)
+
+    rules = [
+        ("Start'", ["Prog"]),
+        ("Prog", ["Stmts"]),
+        ("Stmts", ["Stmts", "Stmt"]),
+        ("Stmts", ["Stmt"]),
+    ]
+    terminals = {"$", "id", "lp", "rp", "semi", "begin", "end"}
+
+    for k in range(kinds):
+        rules.append(("Stmt", [f"kw{k}", "E0", "semi"]))
+        rules.append(("Stmt", [f"kw{k}", "lp", "E0", "rp", "Stmt"]))
+        terminals.add(f"kw{k}")
+
+    rules.append(("Stmt", ["begin", "Stmts", "end"]))
+
+    for level in range(levels):
+        rules.append((f"E{level}", [f"E{level}", f"op{level}", f"E{level + 1}"]))
+        rules.append((f"E{level}", [f"E{level + 1}"]))
+        terminals.add(f"op{level}")
+    rules.append((f"E{levels}", ["lp", "E0", "rp"]))
+    rules.append((f"E{levels}", ["id"]))
+
+    non_terminals = {lhs for lhs, _ in rules}
+    return rules, terminals, non_terminals
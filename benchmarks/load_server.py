@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, generate_program
+
+# Load-test client for server.py. Opens several connections to the Unix
+# socket, keeps a fixed number of requests outstanding on each and reports
+# latency percentiles and throughput. Without --socket a server is started
+# on a temporary socket for the duration of the run.
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return float('nan')
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def client(path, sources, requests, window, latencies, errors):
+    # One connection sending `requests` requests with at most `window`
+    # outstanding; responses are matched to requests by id
+    reader, writer = await asyncio.open_unix_connection(path, limit=1 << 24)
+    sent_at = {}
+    credit = asyncio.Semaphore(window)
+
+    async def send():
+        for i in range(requests):
+            await credit.acquire()
+            sent_at[i] = time.perf_counter()
+            line = json.dumps({'id': i, 'source': sources[i % len(sources)]})
+            writer.write(line.encode() + b'\n')
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for _ in range(requests):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        response = json.loads(line)
+        latencies.append(time.perf_counter() - sent_at.pop(response['id']))
+        if not response['ok']:
+            errors.append(response['error'])
+        credit.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(path, sources, connections, requests, window):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(path, sources, requests, window, latencies, errors)
+                           for _ in range(connections)))
+    return time.perf_counter() - start, sorted(latencies), errors
+
+
+def start_server(path, workers, max_pending):
+    command = [sys.executable, os.path.join(ROOT, 'server.py'), '--socket', path,
+               '--max-pending', str(max_pending)]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    server = subprocess.Popen(command, cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    # The server reports on stderr once the socket is bound
+    line = server.stderr.readline()
+    if not line.startswith('listening'):
+        server.kill()
+        raise RuntimeError(f"server failed to start: {line}{server.stderr.read()}")
+    return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load-test the parse server.")
+    arg_parser.add_argument('--socket', metavar='PATH',
+                            help="server to test (default: start one on a temporary socket)")
+    arg_parser.add_argument('-c', '--connections', type=int, default=8)
+    arg_parser.add_argument('-n', '--requests', type=int, default=200, help="requests per connection")
+    arg_parser.add_argument('-w', '--window', type=int, default=4,
+                            help="outstanding requests per connection")
+    arg_parser.add_argument('--statements', type=int, nargs='+', default=[10, 100, 1000],
+                            help="program sizes sent, in rotation")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="worker processes of the started server")
+    arg_parser.add_argument('--max-pending', type=int, default=64,
+                            help="--max-pending of the started server")
+    args = arg_parser.parse_args()
+
+    sources = [generate_program(statements) for statements in args.statements]
+    server = None
+    directory = None
+    path = args.socket
+    if path is None:
+        directory = tempfile.mkdtemp(prefix='parse-server-')
+        path = os.path.join(directory, 'server.sock')
+        server = start_server(path, args.workers, args.max_pending)
+    try:
+        elapsed, latencies, errors = asyncio.run(
+            run_load(path, sources, args.connections, args.requests, args.window))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(directory, ignore_errors=True)
+
+    total = len(latencies)
+    print(f"{args.connections} connections x {args.requests} requests, "
+          f"window {args.window}, statements {args.statements}")
+    print(f"requests     {total}")
+    print(f"errors       {len(errors)}")
+    print(f"throughput   {total / elapsed:10.1f} req/s")
+    print(f"p50 latency  {percentile(latencies, 50) * 1000:10.2f} ms")
+    print(f"p99 latency  {percentile(latencies, 99) * 1000:10.2f} ms")
+    print(f"max latency  {latencies[-1] * 1000:10.2f} ms")
+    if errors:
+        print(f"first error: {errors[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+
+from common import generate_program
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+# Runs every pipeline phase over generated programs of increasing size,
+# recording the best wall time and the peak traced memory of each phase:
+#
+#   python benchmarks/suite.py --sizes 100,1000,10000 -o results.json
+#   python benchmarks/suite.py --compare results.json
+#
+# With --compare the run is checked against a saved result file and the
+# script exits with status 1 if any phase got slower (or used more memory)
+# by more than --threshold.
+
+
+def best_time(fn, repeat):
+    # Best per-call time of `repeat` samples, each looping fn for at least
+    # 0.2s so that sub-millisecond phases are not dominated by timer noise
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def peak_memory(fn):
+    # Peak bytes allocated while fn runs; timed separately because
+    # tracemalloc slows allocation down
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(phase, fn, repeat, **fields):
+    record = {'phase': phase}
+    record.update(fields)
+    record['seconds'] = best_time(fn, repeat)
+    record['peak_bytes'] = peak_memory(fn)
+    return record
+
+
+def run_suite(args):
+    results = [measure('grammar', Grammar, args.repeat)]
+    parser = LALR(Grammar())
+
+    try:
+        from visualizer import visualize_parse_tree
+    except ImportError:
+        visualize_parse_tree = None
+        print("graphviz is not installed; skipping the visualize phase", file=sys.stderr)
+
+    for statements in args.sizes:
+        code = generate_program(statements, if_blocks=int(statements * args.if_ratio),
+                                nesting=args.nesting, ident_len=args.ident_len,
+                                string_len=args.string_len, seed=args.seed)
+        tokens, lexems = tokenize(code)
+        fields = {'statements': statements, 'chars': len(code), 'tokens': len(tokens)}
+
+        results.append(measure('tokenize', lambda: tokenize(code), args.repeat, **fields))
+        results.append(measure('parse', lambda: parser.parse(tokens), args.repeat, **fields))
+        results.append(measure('build_parse_tree', lambda: parser.build_parse_tree(tokens, lexems),
+                               args.repeat, **fields))
+        results.append(measure('run_flat', lambda: parser.run(tokens, lexems, tree='flat'),
+                               args.repeat, **fields))
+        if visualize_parse_tree is not None and statements <= args.max_visualize:
+            tree = parser.build_parse_tree(tokens, lexems)
+            results.append(measure('visualize', lambda: visualize_parse_tree(tree),
+                                   args.repeat, **fields))
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Print the ratio of every phase to the baseline; returns the number of
+    # regressions beyond threshold
+    previous = {(r['phase'], r.get('statements')): r for r in baseline['results']}
+    regressions = 0
+    print(f"{'phase':<18}{'statements':>11}{'time':>9}{'memory':>9}")
+    for record in results:
+        old = previous.get((record['phase'], record.get('statements')))
+        if old is None:
+            continue
+        time_ratio = record['seconds'] / old['seconds'] if old['seconds'] else 1.0
+        memory_ratio = record['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else 1.0
+        flag = ''
+        if time_ratio > 1 + threshold or memory_ratio > 1 + threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        statements = record.get('statements', '-')
+        print(f"{record['phase']:<18}{statements:>11}{time_ratio:>9.2f}{memory_ratio:>9.2f}{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark every phase of the parser pipeline.")
+    arg_parser.add_argument('--sizes', default='100,1000,10000',
+                            help="comma-separated statement counts (default: %(default)s)")
+    arg_parser.add_argument('--if-ratio', type=float, default=1 / 3,
+                            help="fraction of statements that are if/elseif blocks")
+    arg_parser.add_argument('--nesting', type=int, default=1, help="depth of nested if blocks")
+    arg_parser.add_argument('--ident-len', type=int, default=1, help="identifier length")
+    arg_parser.add_argument('--string-len', type=int, default=10, help="printf string length")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=3, help="timed runs per phase (best is kept)")
+    arg_parser.add_argument('--max-visualize', type=int, default=1000,
+                            help="largest size for the visualize phase")
+    arg_parser.add_argument('-o', '--output', help="write results to this JSON file")
+    arg_parser.add_argument('--compare', metavar='BASELINE', help="compare against a saved JSON file")
+    arg_parser.add_argument('--threshold', type=float, default=0.25,
+                            help="allowed slowdown (or memory growth) before a phase counts as a regression")
+    args = arg_parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(',')]
+
+    results = run_suite(args)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'params': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        ignored = ('repeat', 'threshold')
+        changed = sorted(key for key, value in report['meta']['params'].items()
+                         if key not in ignored and baseline['meta']['params'].get(key) != value)
+        if changed:
+            print(f"warning: baseline was run with different {', '.join(changed)}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import re
+from collections import defaultdict
+
+from grammar import Grammar
+from parse_tables import CompactTable, encode_action
+from table_cache import grammar_fingerprint
+
+# Generates a standalone parser module: the ACTION rows, default reductions
+# and GOTO columns as literal constants, and one reduce function per rule
+# with its length, symbol and GOTO column baked in. The generated module
+# imports nothing, so loading it costs no table construction and no rich.
+
+
+def parse_grammar_text(text):
+    # Rules from the notation of grammar.md:
+    #
+    #   Lhs  → A B c
+    #        | d
+    #
+    # '->' may stand for '→', a line starting with '|' adds an alternative
+    # to the previous left-hand side, and '#' lines and ``` fences are
+    # ignored. Symbols that never appear on a left-hand side are terminals
+    # (token types). If the first rule is not already of the form S' → S,
+    # an augmented start rule is added. Returns (rules, terminals,
+    # non_terminals) for Grammar(rules=...).
+    rules = []
+    lhs = None
+    for line_no, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('```'):
+            continue
+        if line.startswith('|'):
+            if lhs is None:
+                raise ValueError(f"line {line_no}: alternative without a rule")
+            rhs = line[1:]
+        else:
+            parts = re.split(r'→|->', line, maxsplit=1)
+            if len(parts) != 2 or not parts[0].strip():
+                raise ValueError(f"line {line_no}: expected 'Lhs → symbols'")
+            lhs, rhs = parts[0].strip(), parts[1]
+        for alternative in rhs.split('|'):
+            rules.append((lhs, alternative.split()))
+
+    if not rules:
+        raise ValueError("no rules found")
+
+    non_terminals = {lhs for lhs, _ in rules}
+    start = rules[0][0]
+    start_rules = [rhs for lhs, rhs in rules if lhs == start]
+    used = any(start in rhs for _, rhs in rules)
+    if len(start_rules) > 1 or len(start_rules[0]) != 1 or used:
+        augmented = f"{start}'"
+        rules.insert(0, (augmented, [start]))
+        non_terminals.add(augmented)
+
+    terminals = {symbol for _, rhs in rules for symbol in rhs} - non_terminals
+    return rules, terminals, non_terminals
+
+
+def _identifier(symbol):
+    return re.sub(r'\W', '_', symbol)
+
+
+def generate_module(grammar, source='the built-in grammar'):
+    # Python source of a parser module for the grammar's tables
+    table = CompactTable(grammar)
+    rules = grammar.rules
+    states = table.state_count
+
+    # ACTION rows keyed by token type; entries equal to the state's default
+    # reduction are left to DEFAULTS, as in CompactTable
+    action_rows = [{} for _ in range(states)]
+    for (state, term), entry in grammar.action.items():
+        code = encode_action(entry)
+        if code != table.defaults[state]:
+            action_rows[state][term] = code
+
+    goto_columns = defaultdict(dict)
+    for (state, nt), target in grammar.goto.items():
+        goto_columns[nt][state] = target
+
+    out = []
+    emit = out.append
+    emit(f"# Generated by codegen.py from {source}; do not edit.")
+    emit(f"# Grammar fingerprint {grammar_fingerprint(grammar)}, {grammar.method}, {states} states.")
+    emit("")
+    emit("")
+    emit("class ParseError(Exception):")
+    emit("    pass")
+    emit("")
+    emit("")
+    emit(f"RULES = {tuple((lhs, tuple(rhs)) for lhs, rhs in rules)!r}")
+    emit(f"TERMINALS = {tuple(sorted(grammar.terminals))!r}")
+    emit("")
+    emit("# ACTION[state] maps a token type to j + 1 (shift to j) or -(r + 1)")
+    emit("# (reduce by rule r); other tokens take DEFAULTS[state], 0 is an error")
+    emit("ACTION = (")
+    for row in action_rows:
+        emit(f"    {dict(sorted(row.items()))!r},")
+    emit(")")
+    emit(f"DEFAULTS = {tuple(table.defaults)!r}")
+    emit("")
+    for nt in sorted(goto_columns):
+        emit(f"GOTO_{_identifier(nt)} = {dict(sorted(goto_columns[nt].items()))!r}")
+
+    # One reduce function per rule; rule 0 accepts and is handled by the
+    # driver
+    for rule_id, (lhs, rhs) in enumerate(rules):
+        if rule_id == 0:
+            continue
+        n = len(rhs)
+        emit("")
+        emit("")
+        emit(f"def _reduce_{rule_id}(stack, nodes):")
+        emit(f"    # {lhs} -> {' '.join(rhs)}")
+        if n:
+            emit(f"    del stack[-{n}:]")
+            emit(f"    children = nodes[-{n}:]")
+            emit(f"    del nodes[-{n}:]")
+        else:
+            emit("    children = []")
+        emit(f"    nodes.append({{'type': 'non-terminal', 'symbol': {lhs!r}, 'children': children}})")
+        emit(f"    target = GOTO_{_identifier(lhs)}.get(stack[-1])")
+        emit("    if target is None:")
+        emit(f"        raise ParseError(f\"No goto entry for state {{stack[-1]}} and symbol {lhs}\")")
+        emit("    stack.append(target)")
+
+    emit("")
+    emit("")
+    reducers = ['None'] + [f'_reduce_{rule_id}' for rule_id in range(1, len(rules))]
+    emit(f"REDUCERS = ({', '.join(reducers)},)")
+    emit("")
+    emit("")
+    start_len = len(rules[0][1])
+    emit('''def parse(tokens, lexems=None):
+    # Parse a list of token types; lexems maps token index to text. Returns
+    # the parse tree as nested dicts, like LALR.run.
+    if lexems is None:
+        lexems = {}
+    action, defaults, reducers = ACTION, DEFAULTS, REDUCERS
+    stack = [0]
+    nodes = []
+    push, push_node = stack.append, nodes.append
+    count = len(tokens)
+    i = 0
+    token = tokens[0] if count else '$'
+
+    while True:
+        state = stack[-1]
+        code = action[state].get(token, defaults[state])
+
+        if code > 0:
+            push(code - 1)
+            push_node({'type': 'terminal', 'symbol': token, 'value': lexems.get(i, token), 'children': []})
+            i += 1
+            token = tokens[i] if i < count else '$'
+        elif code < -1:
+            reducers[-code - 1](stack, nodes)
+        elif code == -1:
+            # Reducing the augmented start rule accepts''')
+    if start_len:
+        emit(f"            children = nodes[-{start_len}:]")
+    else:
+        emit("            children = []")
+    emit(f"            return {{'type': 'non-terminal', 'symbol': {rules[0][0]!r}, 'children': children}}")
+    emit('''        else:
+            raise ParseError(f"Syntax error: unexpected token '{token}' at position {i}")''')
+    return '\n'.join(out) + '\n'
+
+
+def write_module(grammar, path, source='the built-in grammar'):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_module(grammar, source))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate a standalone parser module.")
+    arg_parser.add_argument('grammar', nargs='?',
+                            help="grammar file in the notation of grammar.md (default: the built-in rules)")
+    arg_parser.add_argument('-o', '--output', default='generated_parser.py', help="module to write")
+    arg_parser.add_argument('--method', choices=('lr1', 'lalr'), default='lr1',
+                            help="table construction method")
+    args = arg_parser.parse_args()
+
+    if args.grammar:
+        with open(args.grammar, encoding='utf-8') as f:
+            rules, terminals, non_terminals = parse_grammar_text(f.read())
+        grammar = Grammar(method=args.method, rules=rules, terminals=terminals,
+                          non_terminals=non_terminals)
+        source = args.grammar
+    else:
+        grammar = Grammar(method=args.method)
+        source = 'the built-in grammar'
+
+    write_module(grammar, args.output, source)
+    print(f"Wrote {args.output} ({grammar.state_count} states)")
+
+
+if __name__ == "__main__":
+    main()
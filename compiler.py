@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+
+from grammar import Grammar
+from LALR import LALR, ParseError
+from table_cache import atomic_write
+from tokenizer import tokenize
+
+# Lowers parse trees to Python source and compiles them to code objects,
+# so a program runs as Python instead of being re-walked as a tree.
+#
+#   X: integer ;                        v_X = 0
+#   Procedure foo( b : integer )        def p_foo(v_b):
+#   b := 1;                                 v_x = 0
+#   If x = 1 and b = 13 then                v_b = 1
+#       printf( "one" );           ->       if v_x == 1 and v_b == 13:
+#   elseif ... else ... end if;                 _write('one')
+#   end foo                                 elif ...
+#                                           return v_b
+#
+# Program identifiers get a v_ prefix (procedures p_) so they cannot clash
+# with Python keywords or the runtime names. A name that is neither the
+# parameter nor a declared global is a procedure local starting at 0.
+# Procedures return the final value of their parameter, which Program.call
+# copies back to the argument variable (copy-in/copy-out).
+
+# Bump whenever the lowering changes, so cached code is recompiled
+COMPILER_VERSION = 1
+CODE_MAGIC = b'LRPC'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.program_cache')
+
+
+class CompileError(Exception):
+    pass
+
+
+def _statements(block):
+    # The St nodes of a left-recursive S -> S St chain, in source order,
+    # without recursing down the chain
+    items = []
+    children = block['children']
+    while len(children) == 2:
+        items.append(children[1])
+        children = children[0]['children']
+    items.append(children[0])
+    items.reverse()
+    return items
+
+
+def _comparison(node):
+    name, _, number = node['children']
+    return f"v_{name['value']} == {int(number['value'])}"
+
+
+def _condition(node):
+    left, _, right = node['children']
+    return f"{_comparison(left)} and {_comparison(right)}"
+
+
+def _lower_procedure(proc, declared):
+    children = proc['children']
+    name, end_name = children[1]['value'], children[7]['value']
+    if name != end_name:
+        raise CompileError(f"procedure {name} ends with 'end {end_name}'")
+    param = children[3]['children'][0]['value']
+
+    body = []
+    assigned = set()
+    used = set()
+    # Work list of St nodes and ready-made lines, each with its indent
+    pending = [(statement, 1) for statement in reversed(_statements(children[5]))]
+    while pending:
+        item, indent = pending.pop()
+        pad = '    ' * indent
+        if isinstance(item, str):
+            body.append(pad + item)
+            continue
+
+        statement = item['children'][0]
+        symbol = statement['symbol']
+        parts = statement['children']
+        if symbol == 'A':
+            target = parts[0]['value']
+            assigned.add(target)
+            body.append(f"{pad}v_{target} = {int(parts[2]['value'])}")
+        elif symbol == 'F':
+            body.append(f"{pad}_write({parts[2]['value'][1:-1]!r})")
+        elif symbol == 'I':
+            # if C then S elseif C then S else S end if
+            for condition in (parts[1], parts[5]):
+                for comparison in (condition['children'][0], condition['children'][2]):
+                    used.add(comparison['children'][0]['value'])
+            body.append(f"{pad}if {_condition(parts[1])}:")
+            branch = [(s, indent + 1) for s in _statements(parts[3])]
+            branch.append((f"elif {_condition(parts[5])}:", indent))
+            branch.extend((s, indent + 1) for s in _statements(parts[7]))
+            branch.append(("else:", indent))
+            branch.extend((s, indent + 1) for s in _statements(parts[9]))
+            pending.extend(reversed(branch))
+        else:
+            raise CompileError(f"unexpected statement {symbol}")
+
+    globals_assigned = sorted((assigned & declared) - {param})
+    local_names = sorted((assigned | used) - declared - {param})
+
+    lines = [f"def p_{name}(v_{param}):"]
+    if globals_assigned:
+        lines.append(f"    global {', '.join('v_' + g for g in globals_assigned)}")
+    if local_names:
+        lines.append(f"    {' = '.join('v_' + n for n in local_names)} = 0")
+    lines.extend(body)
+    lines.append(f"    return v_{param}")
+    return name, lines
+
+
+def lower(tree):
+    # Python source for a parse tree (dict or flat) of the built-in grammar
+    node = tree
+    while node['symbol'] != 'P':
+        if len(node['children']) != 1:
+            raise CompileError(f"expected a program, got {node['symbol']}")
+        node = node['children'][0]
+    decl, proc = node['children']
+
+    declared = {decl['children'][0]['value']}
+    name, proc_lines = _lower_procedure(proc, declared)
+
+    lines = ["# Lowered by compiler.py"]
+    lines.extend(f"v_{g} = 0" for g in sorted(declared))
+    lines.append("")
+    lines.extend(proc_lines)
+    lines.append("")
+    lines.append(f"GLOBALS = {tuple(sorted(declared))!r}")
+    lines.append(f"PROCEDURES = {{{name!r}: p_{name}}}")
+    return '\n'.join(lines) + '\n'
+
+
+def compile_tree(tree, filename='<program>'):
+    source = lower(tree)
+    try:
+        return compile(source, filename, 'exec')
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        # e.g. if blocks nested deeper than Python's indentation limit
+        raise CompileError(f"cannot compile lowered program: {e}") from e
+
+
+def compile_source(source, parser, filename='<program>'):
+    # Tokenize, parse and compile program text; raises ParseError or
+    # CompileError
+    tokens, lexems = tokenize(source)
+    tree, _ = parser.run(tokens, lexems, tree='flat')
+    return compile_tree(tree, filename)
+
+
+def source_digest(source):
+    h = hashlib.sha256()
+    h.update(f"v{COMPILER_VERSION}\n".encode())
+    h.update(source.encode('utf-8'))
+    return h.hexdigest()
+
+
+class CodeCache:
+    # Compiled programs keyed by the hash of their source text, kept in
+    # memory and, with a cache_dir, as marshalled code on disk. Marshal data
+    # is specific to the Python version, so entries carry its magic number.
+    def __init__(self, parser, cache_dir=None):
+        self.parser = parser
+        self.cache_dir = cache_dir
+        self.codes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source):
+        digest = source_digest(source)
+        code = self.codes.get(digest)
+        if code is None and self.cache_dir is not None:
+            code = self._load(digest)
+        if code is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            code = compile_source(source, self.parser, f"<program {digest[:12]}>")
+            if self.cache_dir is not None:
+                self._save(digest, code)
+        self.codes[digest] = code
+        return code
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"program-{digest[:32]}.bin")
+
+    def _header(self, digest):
+        return CODE_MAGIC + importlib.util.MAGIC_NUMBER + bytes.fromhex(digest)
+
+    def _load(self, digest):
+        # None if the entry is missing, stale or corrupt
+        try:
+            with open(self._path(digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        header = self._header(digest)
+        if not data.startswith(header):
+            return None
+        try:
+            return marshal.loads(data[len(header):])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def _save(self, digest, code):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        atomic_write(self._path(digest), self._header(digest) + marshal.dumps(code))
+
+
+class Program:
+    # An executed program module: its globals start at 0 and its
+    # procedures can be called. printf text goes to write (print by
+    # default).
+    def __init__(self, code, write=print):
+        self.namespace = {'_write': write}
+        exec(code, self.namespace)
+
+    @property
+    def procedures(self):
+        return tuple(self.namespace['PROCEDURES'])
+
+    @property
+    def variables(self):
+        return {name: self.namespace['v_' + name] for name in self.namespace['GLOBALS']}
+
+    def call(self, procedure, argument):
+        # argument is the name of a global variable, whose value is copied
+        # in and replaced by the parameter's final value on return, or an
+        # int, which is only copied in. Returns the parameter's final value.
+        function = self.namespace['PROCEDURES'][procedure]
+        if isinstance(argument, str):
+            if argument not in self.namespace['GLOBALS']:
+                raise KeyError(f"no global variable {argument}")
+            key = 'v_' + argument
+            self.namespace[key] = function(self.namespace[key])
+            return self.namespace[key]
+        return function(argument)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compile a program to Python and run it.")
+    arg_parser.add_argument('path', help="program source file")
+    arg_parser.add_argument('--emit', action='store_true', help="print the lowered Python instead of running it")
+    arg_parser.add_argument('--argument', default=None,
+                            help="global variable or integer passed to the procedure (default: the declared global)")
+    arg_parser.add_argument('--no-cache', action='store_true', help="do not read or write the on-disk code cache")
+    args = arg_parser.parse_args()
+
+    with open(args.path, encoding='utf-8') as f:
+        source = f.read()
+    parser = LALR(Grammar())
+    try:
+        if args.emit:
+            tokens, lexems = tokenize(source)
+            print(lower(parser.run(tokens, lexems, tree='flat')[0]), end='')
+            return
+        cache = CodeCache(parser, None if args.no_cache else DEFAULT_CACHE_DIR)
+        program = Program(cache.get(source))
+    except (ParseError, CompileError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    argument = args.argument
+    if argument is None:
+        argument = program.namespace['GLOBALS'][0]
+    elif argument.lstrip('-').isdigit():
+        argument = int(argument)
+    for procedure in program.procedures:
+        program.call(procedure, argument)
+    for name, value in program.variables.items():
+        print(f"{name} = {value}")
+
+
+if __name__ == "__main__":
+    main()
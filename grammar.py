@@ -1,154 +1,305 @@
-from rich.console import Console
-from rich.table import Table
-from rich.text import Text
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Mapping
+from table_cache import load_tables, save_tables
+
+class _BitsetView(Mapping):
+    # Read-only {symbol: set of terminals} view over int bitsets, decoding
+    # a set the first time it is looked up. The bit above the terminals
+    # decodes to '' (the symbol is nullable).
+    def __init__(self, bits, terminal_list):
+        self.bits = bits
+        self.names = terminal_list + ['']
+        self.decoded = {}
+
+    def __getitem__(self, symbol):
+        result = self.decoded.get(symbol)
+        if result is None:
+            bits = self.bits[symbol]
+            result = set()
+            while bits:
+                low = bits & -bits
+                result.add(self.names[low.bit_length() - 1])
+                bits ^= low
+            self.decoded[symbol] = result
+        return result
+
+    def __iter__(self):
+        return iter(self.bits)
+
+    def __len__(self):
+        return len(self.bits)
+
 
 class Grammar:
-    def __init__(self):
-        # Define the grammar rules with adjusted token names
+    def __init__(self, cache_dir=None, method='lr1', rules=None, terminals=None, non_terminals=None,
+                 lazy=False):
+        # method selects the table builder: 'lr1' builds canonical LR(1)
+        # states, 'lalr' merges states with the same LR(0) core. With
+        # lazy=True no table is built here (unless the cache has one); LALR
+        # then builds the LR(1) states as the parser reaches them, see
+        # parse_tables.LazyTable.
+        if method not in ('lr1', 'lalr'):
+            raise ValueError(f"Unknown table construction method: {method}")
+        if lazy and method != 'lr1':
+            raise ValueError("Lazy tables are only built with the lr1 method")
+        self.method = method
+        self.state_count = None
+        # Worklist steps until FIRST/FOLLOW stopped changing; left as None
+        # when the tables come from the cache
+        self.first_iterations = None
+        self.follow_iterations = None
+
         self.goto = None
         self.follow = None
         self.first = None
         self.action = None
-        self.rules = [
-            ("P'", ["P"]),
-            ("P", ["Decl", "Proc"]),
-            ("Decl", ["id", "COLON", "T", "SEMI"]),
-            ("Param", ["id", "COLON", "T"]),
-            ("Proc", ["procedure", "id", "LPAREN", "Param", "RPAREN", "S", "end", "id"]),
-            ("S", ["St"]),
-            ("S", ["S", "St"]),
-            ("St", ["A", "SEMI"]),
-            ("St", ["I", "SEMI"]),
-            ("St", ["F", "SEMI"]),
-            ("A", ["id", "ASSIGN", "num"]),
-            ("I", ["if", "C", "then", "S", "elseif", "C", "then", "S", "else", "S", "end", "if"]),
-            ("C", ["Cmp", "and", "Cmp"]),
-            ("Cmp", ["id", "EQ", "num"]),
-            ("F", ["printf", "LPAREN", "str", "RPAREN"]),
-            ("T", ["integer"])
-        ]
-
-        # Define terminals and non-terminals
-        self.terminals = {
-            "id", "COLON", "integer", "SEMI", "procedure", "LPAREN", "RPAREN",
-            "ASSIGN", "num", "if", "then", "elseif", "else", "end", "and", "EQ", "printf", "str", "$"
-        }
-
-        self.non_terminals = {
-            "P'", "P", "Decl", "Param", "Proc", "S", "St", "A", "I", "C", "Cmp", "F", "T"
-        }
+
+        if rules is not None:
+            # Custom grammar; the first rule must be the augmented start rule.
+            # Symbols that never appear on a left-hand side are terminals.
+            self.rules = [(lhs, list(rhs)) for lhs, rhs in rules]
+            if non_terminals is None:
+                non_terminals = {lhs for lhs, _ in self.rules}
+            if terminals is None:
+                terminals = {symbol for _, rhs in self.rules for symbol in rhs} - set(non_terminals)
+            self.non_terminals = set(non_terminals)
+            self.terminals = set(terminals) | {'$'}
+        else:
+            # Define the grammar rules with adjusted token names
+            self.rules = [
+                ("P'", ["P"]),
+                ("P", ["Decl", "Proc"]),
+                ("Decl", ["id", "COLON", "T", "SEMI"]),
+                ("Param", ["id", "COLON", "T"]),
+                ("Proc", ["procedure", "id", "LPAREN", "Param", "RPAREN", "S", "end", "id"]),
+                ("S", ["St"]),
+                ("S", ["S", "St"]),
+                ("St", ["A", "SEMI"]),
+                ("St", ["I", "SEMI"]),
+                ("St", ["F", "SEMI"]),
+                ("A", ["id", "ASSIGN", "num"]),
+                ("I", ["if", "C", "then", "S", "elseif", "C", "then", "S", "else", "S", "end", "if"]),
+                ("C", ["Cmp", "and", "Cmp"]),
+                ("Cmp", ["id", "EQ", "num"]),
+                ("F", ["printf", "LPAREN", "str", "RPAREN"]),
+                ("T", ["integer"])
+            ]
+
+            # Define terminals and non-terminals
+            self.terminals = {
+                "id", "COLON", "integer", "SEMI", "procedure", "LPAREN", "RPAREN",
+                "ASSIGN", "num", "if", "then", "elseif", "else", "end", "and", "EQ", "printf", "str", "$"
+            }
+
+            self.non_terminals = {
+                "P'", "P", "Decl", "Param", "Proc", "S", "St", "A", "I", "C", "Cmp", "F", "T"
+            }
+
+        # The augmented start symbol, P' for the built-in grammar
+        self.start = self.rules[0][0]
+
+        # Reuse tables from a previous run when the grammar is unchanged
+        if cache_dir is not None and self.load_cached_tables(cache_dir):
+            return
 
         # Compute FIRST and FOLLOW sets
         self.compute_first_sets()
         self.compute_follow_sets()
+        if lazy:
+            return
 
         # Build the parsing table
-        self.build_parsing_table()
+        if method == 'lalr':
+            self.build_lalr_parsing_table()
+        else:
+            self.build_parsing_table()
+
+        if cache_dir is not None:
+            try:
+                save_tables(self, cache_dir)
+            except OSError:
+                pass  # A read-only cache directory should not stop parsing
+
+    def load_cached_tables(self, cache_dir):
+        payload = load_tables(self, cache_dir)
+        if payload is None:
+            return False
+        self.action = payload['action']
+        self.goto = payload['goto']
+        self.first = payload['first']
+        self.follow = payload['follow']
+        self.state_count = payload['state_count']
+        return True
 
     def compute_first_sets(self):
-        # Initialize FIRST sets
-        self.first = {symbol: set() for symbol in self.terminals | self.non_terminals}
-
-        # FIRST set for terminals is the terminal itself
-        for terminal in self.terminals:
-            self.first[terminal] = {terminal}
-
-        # Compute FIRST sets for non-terminals
-        changed = True
-        while changed:
-            changed = False
-            for lhs, rhs in self.rules:
-                if not rhs:  # Empty production
-                    if '' not in self.first[lhs]:
-                        self.first[lhs].add('')
-                        changed = True
-                else:
-                    all_nullable = True
-                    for symbol in rhs:
-                        # Add FIRST(symbol) - {''} to FIRST(lhs)
-                        first_symbol = self.first[symbol] - {''}
-                        if first_symbol - self.first[lhs]:
-                            self.first[lhs] |= first_symbol
-                            changed = True
-
-                        # If symbol is not nullable, break
-                        if '' not in self.first[symbol]:
-                            all_nullable = False
-                            break
-
-                    # If all symbols in RHS are nullable, add '' to FIRST(lhs)
-                    if all_nullable and '' not in self.first[lhs]:
-                        self.first[lhs].add('')
-                        changed = True
+        # FIRST sets are int bitsets: bit i stands for terminal_list[i] and
+        # the bit above the terminals for '' (nullable). A production is
+        # re-examined only when the FIRST set of a symbol on its right-hand
+        # side grew.
+        terminal_list = sorted(self.terminals)
+        terminal_bits = {term: 1 << idx for idx, term in enumerate(terminal_list)}
+        epsilon = 1 << len(terminal_list)
+        no_epsilon = epsilon - 1
+
+        first = dict(terminal_bits)
+        for nt in self.non_terminals:
+            first[nt] = 0
+
+        # Productions to revisit when a symbol's FIRST set changes
+        users = defaultdict(list)
+        for rule_id, (_, rhs) in enumerate(self.rules):
+            for symbol in set(rhs):
+                if symbol in self.non_terminals:
+                    users[symbol].append(rule_id)
+
+        worklist = deque(range(len(self.rules)))
+        queued = [True] * len(self.rules)
+        self.first_iterations = 0
+        while worklist:
+            rule_id = worklist.popleft()
+            queued[rule_id] = False
+            self.first_iterations += 1
+            lhs, rhs = self.rules[rule_id]
+
+            # FIRST(rhs): each symbol's FIRST up to the first one that is not
+            # nullable, plus '' if every symbol is nullable
+            bits = 0
+            for symbol in rhs:
+                symbol_bits = first[symbol]
+                bits |= symbol_bits & no_epsilon
+                if not symbol_bits & epsilon:
+                    break
+            else:
+                bits |= epsilon
+
+            if bits & ~first[lhs]:
+                first[lhs] |= bits
+                for user in users[lhs]:
+                    if not queued[user]:
+                        queued[user] = True
+                        worklist.append(user)
+
+        self.first_bits = first
+        self.first = _BitsetView(first, terminal_list)
 
     def compute_follow_sets(self):
-        # Initialize FOLLOW sets
-        self.follow = {nt: set() for nt in self.non_terminals}
+        # FOLLOW sets use the bit layout of compute_first_sets. FIRST(beta)
+        # contributions are fixed once FIRST is known, so they are added in
+        # one pass; what remains is FOLLOW(A) flowing into FOLLOW(B) for
+        # every A -> alpha B beta with beta nullable, propagated along those
+        # edges with a worklist.
+        first = self.first_bits
+        terminal_list = sorted(self.terminals)
+        epsilon = 1 << len(terminal_list)
+        no_epsilon = epsilon - 1
+
+        follow = {nt: 0 for nt in self.non_terminals}
 
         # Add $ to FOLLOW(S') where S' is the start symbol
-        self.follow["P'"] = {'$'}
-
-        # Compute FOLLOW sets
-        changed = True
-        while changed:
-            changed = False
-            for lhs, rhs in self.rules:
-                for i, symbol in enumerate(rhs):
-                    if symbol in self.non_terminals:
-                        # For A -> αBβ, add FIRST(β) - {''} to FOLLOW(B)
-                        first_beta = set()
-                        nullable_beta = True
-
-                        for beta in rhs[i + 1:]:
-                            beta_first = self.first[beta] - {''}
-                            first_beta |= beta_first
-                            if '' not in self.first[beta]:
-                                nullable_beta = False
-                                break
-
-                        if first_beta - self.follow[symbol]:
-                            self.follow[symbol] |= first_beta
-                            changed = True
-
-                        # If β is nullable or empty, add FOLLOW(A) to FOLLOW(B)
-                        if nullable_beta or i == len(rhs) - 1:
-                            if self.follow[lhs] - self.follow[symbol]:
-                                self.follow[symbol] |= self.follow[lhs]
-                                changed = True
+        follow[self.start] = first['$']
+
+        flows_into = defaultdict(set)
+        for lhs, rhs in self.rules:
+            # Walk right to left, keeping FIRST of the symbols after the
+            # current one and whether they are all nullable
+            trailer = 0
+            nullable = True
+            for symbol in reversed(rhs):
+                if symbol in follow:
+                    follow[symbol] |= trailer
+                    if nullable and symbol != lhs:
+                        flows_into[lhs].add(symbol)
+                symbol_bits = first[symbol]
+                if symbol_bits & epsilon:
+                    trailer |= symbol_bits & no_epsilon
+                else:
+                    trailer = symbol_bits
+                    nullable = False
+
+        worklist = deque(nt for nt in self.non_terminals if follow[nt])
+        queued = set(worklist)
+        self.follow_iterations = 0
+        while worklist:
+            source = worklist.popleft()
+            queued.discard(source)
+            self.follow_iterations += 1
+            source_bits = follow[source]
+            for target in flows_into.get(source, ()):
+                if source_bits & ~follow[target]:
+                    follow[target] |= source_bits
+                    if target not in queued:
+                        queued.add(target)
+                        worklist.append(target)
+
+        self.follow_bits = follow
+        self.follow = _BitsetView(follow, terminal_list)
+
+    def index_items(self):
+        # Table construction works on integer-encoded LR items. The LR(0)
+        # core of an item packs rule id and dot position into one int,
+        # (rule_id << dot_bits) | dot, and lookaheads are terminal ids.
+        # Item sets map each core to the frozenset of its lookahead ids, so
+        # items sharing a core are handled with one set operation.
+        self.terminal_list = sorted(self.terminals)
+        self.terminal_ids = {term: idx for idx, term in enumerate(self.terminal_list)}
+        # Extra lookahead id standing for '#' during LALR lookahead propagation
+        self.dummy_lookahead = len(self.terminal_list)
+
+        self.rule_rhs = [tuple(rhs) for _, rhs in self.rules]
+        self.dot_bits = max(len(rhs) for rhs in self.rule_rhs).bit_length()
+
+        self.productions_by_lhs = defaultdict(list)
+        for rule_id, (lhs, _) in enumerate(self.rules):
+            self.productions_by_lhs[lhs].append(rule_id)
+        self.productions_by_lhs = dict(self.productions_by_lhs)
+
+        # suffix_first[rule_id][pos] is (FIRST(rhs[pos:]) as lookahead ids,
+        # whether rhs[pos:] is nullable)
+        first_ids = {symbol: frozenset(self.terminal_ids[t] for t in first if t != '')
+                     for symbol, first in self.first.items()}
+        self.suffix_first = []
+        for rhs in self.rule_rhs:
+            suffixes = [None] * len(rhs) + [(frozenset(), True)]
+            for pos in range(len(rhs) - 1, -1, -1):
+                symbol = rhs[pos]
+                if '' in self.first[symbol]:
+                    rest_first, rest_nullable = suffixes[pos + 1]
+                    suffixes[pos] = (first_ids[symbol] | rest_first, rest_nullable)
+                else:
+                    suffixes[pos] = (first_ids[symbol], False)
+            self.suffix_first.append(suffixes)
+
+        self._closure_cache = {}
+
+    def pack_core(self, rule_id, dot):
+        return (rule_id << self.dot_bits) | dot
+
+    def unpack_core(self, core):
+        return core >> self.dot_bits, core & ((1 << self.dot_bits) - 1)
 
     def build_parsing_table(self):
         self.action = {}
         self.goto = {}
+        self.index_items()
 
-        # Build canonical collection of LR(1) items
-        # Using tuples instead of lists for hashability
-        start_item = (("P'", (".", "P")), '$')
-        state0 = self.closure({start_item})
-        states = [state0]
-        state_map = {frozenset(state0): 0}
+        # Build canonical collection of LR(1) items. A state is identified by
+        # its kernel, a frozenset of (core, lookaheads) pairs, which
+        # determines its closure.
+        start_kernel = frozenset({(self.pack_core(0, 0), frozenset({self.terminal_ids['$']}))})
+        states = [self.closure(start_kernel)]
+        state_map = {start_kernel: 0}
 
         # Process all states
         for i, state in enumerate(states):
-            # For each grammar symbol X
-            for X in self.terminals | self.non_terminals:
-                if X == '$':
-                    continue
-
-                # Compute GOTO(I,X)
-                goto_set = self.goto_operation(state, X)
-
-                if not goto_set:
-                    continue
-
+            # Compute GOTO(I,X) for every symbol X that follows a dot in I
+            for X, kernel in sorted(self.goto_kernels(state).items()):
                 # Check if this state already exists
-                goto_set_frozen = frozenset(goto_set)
-                if goto_set_frozen in state_map:
-                    j = state_map[goto_set_frozen]
+                if kernel in state_map:
+                    j = state_map[kernel]
                 else:
                     j = len(states)
-                    state_map[goto_set_frozen] = j
-                    states.append(goto_set)
+                    state_map[kernel] = j
+                    states.append(self.closure(kernel))
 
                 # Fill action and goto tables
                 if X in self.terminals:
@@ -157,88 +308,184 @@ class Grammar:
                     self.goto[(i, X)] = j
 
             # Add reduce actions
-            for (lhs, rhs), lookahead in state:
-                dot_index = rhs.index('.') if '.' in rhs else -1
-                if dot_index == len(rhs) - 1:  # Dot at the end
-                    if lhs == "P'" and rhs == (".", "P") and lookahead == '$':
-                        self.action[(i, '$')] = ('accept',)
-                    else:
-                        real_rhs = tuple(s for s in rhs if s != '.')
-                        # Find the rule index
-                        rule_idx = None
-                        for idx, (rule_lhs, rule_rhs) in enumerate(self.rules):
-                            if rule_lhs == lhs and list(real_rhs) == rule_rhs:
-                                rule_idx = idx
-                                break
-
-                        if rule_idx is not None:
-                            for term in self.terminals:
-                                if term == lookahead or lookahead == '':
-                                    self.action[(i, term)] = ('reduce', rule_idx)
-
-    def closure(self, items):
-        result = set(items)
-        worklist = list(items)
+            self.add_reduce_actions(i, state)
 
+        self.state_count = len(states)
+
+    def build_lalr_parsing_table(self):
+        self.action = {}
+        self.goto = {}
+        self.index_items()
+        dot_mask = (1 << self.dot_bits) - 1
+        dummy = frozenset({self.dummy_lookahead})
+
+        # Build the LR(0) automaton; states are identified by their kernel
+        # of LR(0) cores
+        start_core = self.pack_core(0, 0)
+        start_kernel = frozenset({start_core})
+        kernels = [start_kernel]
+        kernel_map = {start_kernel: 0}
+        transitions = {}
+
+        for i, kernel in enumerate(kernels):
+            moves = defaultdict(set)
+            for core in self.lr0_closure(kernel):
+                rhs = self.rule_rhs[core >> self.dot_bits]
+                dot = core & dot_mask
+                if dot < len(rhs):
+                    moves[rhs[dot]].add(core + 1)
+
+            for X in sorted(moves):
+                target = frozenset(moves[X])
+                if target not in kernel_map:
+                    kernel_map[target] = len(kernels)
+                    kernels.append(target)
+                transitions[(i, X)] = kernel_map[target]
+
+        # Determine lookaheads: closing each kernel item over the dummy
+        # lookahead '#' shows which lookaheads are generated spontaneously
+        # and which propagate from that kernel item (dragon book 4.7.5)
+        lookaheads = {(i, core): set() for i, kernel in enumerate(kernels) for core in kernel}
+        lookaheads[(0, start_core)].add(self.terminal_ids['$'])
+        propagates = defaultdict(set)
+
+        for i, kernel in enumerate(kernels):
+            for kernel_core in kernel:
+                probe = frozenset({(kernel_core, dummy)})
+                for core, core_lookaheads in self.closure(probe).items():
+                    rhs = self.rule_rhs[core >> self.dot_bits]
+                    dot = core & dot_mask
+                    if dot == len(rhs):
+                        continue
+                    target = (transitions[(i, rhs[dot])], core + 1)
+                    if self.dummy_lookahead in core_lookaheads:
+                        propagates[(i, kernel_core)].add(target)
+                    lookaheads[target] |= core_lookaheads - dummy
+
+        # Propagate until nothing changes, revisiting only kernel items
+        # whose lookahead set grew
+        worklist = deque(lookaheads)
+        pending = set(worklist)
         while worklist:
-            item = worklist.pop(0)
-            (lhs, rhs), lookahead = item
-
-            # Convert rhs to a list temporarily for easier manipulation
-            rhs_list = list(rhs)
-            if '.' in rhs_list and rhs_list.index('.') < len(rhs_list) - 1:
-                dot_pos = rhs_list.index('.')
-                next_symbol = rhs_list[dot_pos + 1]
-
-                if next_symbol in self.non_terminals:
-                    # Compute first set of the string after the next_symbol
-                    beta = rhs_list[dot_pos + 2:] if dot_pos + 2 < len(rhs_list) else []
-                    beta_with_lookahead = beta + [lookahead]
-
-                    first_beta_a = set()
-                    for symbol in beta_with_lookahead:
-                        if symbol in self.terminals or symbol == '$':
-                            first_beta_a.add(symbol)
-                            break
-                        symbol_first = self.first[symbol] - {''}
-                        first_beta_a |= symbol_first
-                        if '' not in self.first[symbol]:
-                            break
-                    else:
-                        first_beta_a.add(lookahead)
+            source = worklist.popleft()
+            pending.discard(source)
+            source_lookaheads = lookaheads[source]
+            for target in propagates.get(source, ()):
+                if not source_lookaheads <= lookaheads[target]:
+                    lookaheads[target] |= source_lookaheads
+                    if target not in pending:
+                        pending.add(target)
+                        worklist.append(target)
+
+        # Fill action and goto tables
+        for (i, X), j in transitions.items():
+            if X in self.terminals:
+                self.action[(i, X)] = ('shift', j)
+            else:
+                self.goto[(i, X)] = j
+
+        for i, kernel in enumerate(kernels):
+            items = frozenset((core, frozenset(lookaheads[(i, core)])) for core in kernel)
+            self.add_reduce_actions(i, self.closure(items))
+
+        self.state_count = len(kernels)
+
+    def add_reduce_actions(self, i, items):
+        dot_mask = (1 << self.dot_bits) - 1
+        for core, lookaheads in items.items():
+            rule_id = core >> self.dot_bits
+            if core & dot_mask == len(self.rule_rhs[rule_id]):
+                for lookahead in lookaheads:
+                    self.action[(i, self.terminal_list[lookahead])] = ('reduce', rule_id)
+
+    def lr0_closure(self, kernel):
+        # Closure over LR(0) cores
+        dot_mask = (1 << self.dot_bits) - 1
+        result = set(kernel)
+        worklist = deque(kernel)
 
-                    # Add closure items
-                    for prod_lhs, prod_rhs in self.rules:
-                        if prod_lhs == next_symbol:
-                            for term in first_beta_a:
-                                new_item = ((prod_lhs, (".",) + tuple(prod_rhs)), term)
-                                if new_item not in result:
-                                    result.add(new_item)
-                                    worklist.append(new_item)
+        while worklist:
+            core = worklist.popleft()
+            rhs = self.rule_rhs[core >> self.dot_bits]
+            dot = core & dot_mask
+            if dot < len(rhs) and rhs[dot] in self.productions_by_lhs:
+                for prod_id in self.productions_by_lhs[rhs[dot]]:
+                    new_core = prod_id << self.dot_bits
+                    if new_core not in result:
+                        result.add(new_core)
+                        worklist.append(new_core)
 
         return result
 
+    def closure(self, kernel):
+        # LR(1) closure of a kernel given as (core, lookaheads) pairs.
+        # Returns {core: frozenset of lookahead ids}; memoized per kernel.
+        result = self._closure_cache.get(kernel)
+        if result is not None:
+            return result
+
+        dot_bits = self.dot_bits
+        dot_mask = (1 << dot_bits) - 1
+        rule_rhs = self.rule_rhs
+        productions_by_lhs = self.productions_by_lhs
+        suffix_first = self.suffix_first
+
+        lookaheads = dict(kernel)
+        worklist = deque(lookaheads)
+        pending = set(worklist)
+
+        while worklist:
+            core = worklist.popleft()
+            pending.discard(core)
+            rule_id = core >> dot_bits
+            dot = core & dot_mask
+            rhs = rule_rhs[rule_id]
+
+            if dot < len(rhs) and rhs[dot] in productions_by_lhs:
+                # Lookaheads of the new items are FIRST(beta a)
+                first_beta, nullable_beta = suffix_first[rule_id][dot + 1]
+                new_lookaheads = first_beta | lookaheads[core] if nullable_beta else first_beta
+
+                # Add closure items, revisiting cores whose lookaheads grew
+                for prod_id in productions_by_lhs[rhs[dot]]:
+                    new_core = prod_id << dot_bits
+                    current = lookaheads.get(new_core)
+                    if current is None:
+                        lookaheads[new_core] = new_lookaheads
+                    elif not new_lookaheads <= current:
+                        lookaheads[new_core] = current | new_lookaheads
+                    else:
+                        continue
+                    if new_core not in pending:
+                        pending.add(new_core)
+                        worklist.append(new_core)
+
+        self._closure_cache[kernel] = lookaheads
+        return lookaheads
+
+    def goto_kernels(self, items):
+        # Kernels of GOTO(I,X) for every X following a dot in the closed
+        # item set I; advancing the dot adds one to the core
+        dot_mask = (1 << self.dot_bits) - 1
+        kernels = defaultdict(list)
+
+        for core, lookaheads in items.items():
+            rhs = self.rule_rhs[core >> self.dot_bits]
+            if core & dot_mask < len(rhs):
+                kernels[rhs[core & dot_mask]].append((core + 1, lookaheads))
+
+        return {X: frozenset(kernel) for X, kernel in kernels.items()}
+
     def goto_operation(self, items, symbol):
-        goto_items = set()
-
-        for (lhs, rhs), lookahead in items:
-            # Convert to list for manipulation
-            rhs_list = list(rhs)
-            if '.' in rhs_list and rhs_list.index('.') < len(rhs_list) - 1:
-                dot_pos = rhs_list.index('.')
-                next_symbol = rhs_list[dot_pos + 1]
-
-                if next_symbol == symbol:
-                    # Move the dot
-                    rhs_list[dot_pos], rhs_list[dot_pos + 1] = rhs_list[dot_pos + 1], rhs_list[dot_pos]
-                    # Convert back to tuple for hashability
-                    new_item = ((lhs, tuple(rhs_list)), lookahead)
-                    goto_items.add(new_item)
-
-        return self.closure(goto_items)
+        kernel = self.goto_kernels(items).get(symbol)
+        return self.closure(kernel) if kernel else {}
     
 
     def print_parse_table(self):
+        from rich.console import Console
+        from rich.table import Table
+        from rich.text import Text
+
         console = Console()
 
         # Get all states
@@ -246,7 +493,7 @@ class Grammar:
 
         # Terminals and non-terminals
         terminals = sorted(self.terminals - {'$'}) + ['$']
-        non_terminals = sorted(self.non_terminals - {"P'"})  # Exclude augmented start
+        non_terminals = sorted(self.non_terminals - {self.start})  # Exclude augmented start
 
         # Build ACTION table
         action_table = defaultdict(dict)
@@ -270,16 +517,15 @@ class Grammar:
 
             for term in terminals:
                 action = action_table[state].get(term, "")
-                if term=="$" and state==1:
-                    row.append(Text("acc", style="bold green"))
-                elif isinstance(action, tuple):
-                    if action[0] == 'shift':
+                if isinstance(action, tuple):
+                    if action[0] == 'accept' or (action == ('reduce', 0) and term == '$'):
+                        # Reducing by the augmented start rule on $ accepts;
+                        # highlight the accept cell
+                        row.append(Text("acc", style="bold green"))
+                    elif action[0] == 'shift':
                         row.append(f"s{action[1]}")
                     elif action[0] == 'reduce':
                         row.append(f"r{action[1]}")
-                    elif action[0] == 'accept':
-                        # Highlight the accept cell
-                        row.append(Text("acc", style="bold green"))
                     else:
                         row.append("")
                 else:
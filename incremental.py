@@ -0,0 +1,199 @@
+from bisect import bisect_left
+
+from LALR import ParseError
+from tokenizer import TOKEN_PATTERN, classify, tokenize_with_offsets
+
+# Incremental reparsing for editors. Tree nodes are the usual dicts plus two
+# bookkeeping keys: 'state', the LR state on top of the stack when the
+# node's first token was shifted, and 'ntok', the number of tokens it spans.
+# Nodes are never modified after they are built, so a new tree can share
+# unchanged subtrees with the previous one.
+
+
+class Document:
+    # Source text with its tokens (parallel lists) and parse tree
+    def __init__(self, text, types, values, offsets, tree):
+        self.text = text
+        self.types = types
+        self.values = values
+        self.offsets = offsets
+        self.tree = tree
+
+
+class _Frontier:
+    # Old subtrees that may be reused, keyed by their start index in the new
+    # token list. A node is reusable when its tokens and the token after it
+    # lie in the unchanged prefix [0, prefix_end) or the unchanged suffix
+    # starting at old index suffix_start.
+    def __init__(self, root, prefix_end, suffix_start, shift_by):
+        self.prefix_end = prefix_end
+        self.suffix_start = suffix_start
+        self.shift_by = shift_by
+        self.by_start = {}
+
+        # Split the old tree along the edited region, iteratively since the
+        # S -> S St chain makes trees deep. The root itself is never shifted.
+        pending = []
+        start = 0
+        for child in root['children']:
+            pending.append((child, start))
+            start += child['ntok']
+        while pending:
+            node, start = pending.pop()
+            if self._reusable(start, node['ntok']):
+                self.by_start[self._new_index(start)] = node
+            else:
+                for child in node['children']:
+                    pending.append((child, start))
+                    start += child['ntok']
+
+    def _reusable(self, start, ntok):
+        return ntok > 0 and (start + ntok < self.prefix_end or start >= self.suffix_start)
+
+    def _new_index(self, start):
+        return start if start < self.prefix_end else start + self.shift_by
+
+    def take(self, index, state):
+        # The reusable node starting at index, if it was parsed from the same
+        # state; otherwise split it so its later children remain candidates
+        node = self.by_start.pop(index, None)
+        if node is None or node['state'] == state:
+            return node
+
+        # Nodes on its left spine start in the same state, so skip them
+        while node['children']:
+            start = index
+            children = node['children']
+            for child in children:
+                if start != index and child['ntok'] > 0:
+                    self.by_start[start] = child
+                start += child['ntok']
+            node = children[0]
+        return None
+
+
+class IncrementalParser:
+    def __init__(self, parser):
+        self.parser = parser
+
+    def parse(self, text):
+        types, lexems, offsets = tokenize_with_offsets(text)
+        # reparse splices plain lists
+        values, offsets = list(lexems.values()), offsets.tolist()
+        return Document(text, types, values, offsets, self._run(types, values, None))
+
+    def reparse(self, doc, offset, deleted, inserted):
+        # Apply an edit (replace `deleted` characters at `offset` with the
+        # string `inserted`) and return a new Document; doc stays valid
+        removed = doc.text[offset:offset + deleted]
+        text = doc.text[:offset] + inserted + doc.text[offset + deleted:]
+
+        # Adding or removing a quote can re-pair string literals anywhere
+        # after the edit, so start over
+        if '"' in removed or '"' in inserted:
+            return self.parse(text)
+
+        delta = len(inserted) - deleted
+        old_offsets = doc.offsets
+
+        # Re-lex from the last token starting before the edit until a new
+        # token starts where a shifted old token did; the scanner keeps no
+        # state between tokens, so everything from there on is unchanged
+        first = max(0, bisect_left(old_offsets, offset) - 1)
+        resume = min(old_offsets[first], offset) if old_offsets else 0
+        inserted_end = offset + len(inserted)
+
+        types, values, offsets = [], [], []
+        resync = bisect_left(old_offsets, offset + deleted)
+        for match in TOKEN_PATTERN.finditer(text, resume):
+            start = match.start()
+            if start >= inserted_end:
+                old_start = start - delta
+                while resync < len(old_offsets) and old_offsets[resync] < old_start:
+                    resync += 1
+                if resync < len(old_offsets) and old_offsets[resync] == old_start:
+                    break
+            value = match.group()
+            types.append(classify(match.lastgroup, value))
+            values.append(value)
+            offsets.append(start)
+        else:
+            resync = len(old_offsets)
+
+        shift_by = first + len(types) - resync
+        new_types = doc.types[:first] + types + doc.types[resync:]
+        new_values = doc.values[:first] + values + doc.values[resync:]
+        new_offsets = old_offsets[:first] + offsets + [o + delta for o in old_offsets[resync:]]
+
+        frontier = _Frontier(doc.tree, first, resync, shift_by)
+        tree = self._run(new_types, new_values, frontier)
+        return Document(text, new_types, new_values, new_offsets, tree)
+
+    def _run(self, types, values, frontier):
+        # LR driver that shifts whole reusable subtrees from the frontier
+        table = self.parser.table
+        action, goto = table.action, table.goto
+        terminal_ids, non_terminal_ids = table.terminal_ids, table.non_terminal_ids
+        rule_lhs, rule_len = table.rule_lhs, table.rule_len
+        rules = self.parser.grammar.rules
+        end_id = terminal_ids['$']
+
+        stack = [0]
+        nodes = []
+        i = 0
+        count = len(types)
+
+        while True:
+            state = stack[-1]
+            symbol_id = terminal_ids.get(types[i]) if i < count else end_id
+            code = action(state, symbol_id) if symbol_id is not None else 0
+
+            if code > 0:
+                node = frontier.take(i, state) if frontier is not None else None
+                if node is None:
+                    node = {
+                        'type': 'terminal',
+                        'symbol': types[i],
+                        'value': values[i],
+                        'children': [],
+                        'state': state,
+                        'ntok': 1
+                    }
+                    stack.append(code - 1)
+                elif node['type'] == 'terminal':
+                    stack.append(code - 1)
+                else:
+                    stack.append(goto(state, non_terminal_ids[node['symbol']]))
+                nodes.append(node)
+                i += node['ntok']
+
+            elif code < 0:
+                rule_index = -code - 1
+                n = rule_len[rule_index]
+                if n:
+                    del stack[-n:]
+                    children = nodes[-n:]
+                    del nodes[-n:]
+                else:
+                    children = []
+
+                state = stack[-1]
+                node = {
+                    'type': 'non-terminal',
+                    'symbol': rules[rule_index][0],
+                    'children': children,
+                    'state': state,
+                    'ntok': sum(child['ntok'] for child in children)
+                }
+                nodes.append(node)
+
+                if rule_index == 0 and state == 0:
+                    return node
+
+                target = goto(state, rule_lhs[rule_index])
+                if target < 0:
+                    raise ParseError(f"No goto entry for state {state} and symbol {node['symbol']}")
+                stack.append(target)
+            else:
+                current_token = types[i] if i < count else '$'
+                raise ParseError(f"Syntax error: unexpected token '{current_token}' at position {i}")
@@ -0,0 +1,196 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from itertools import count
+
+from grammar import Grammar
+
+# Optional instrumentation for the parsing pipeline. Nothing here is wired
+# into Grammar or LALR: an Instrumentation object swaps counting wrappers in
+# around the calls it measures, so with instrumentation disabled the normal
+# code paths run unchanged. DISABLED offers the same interface and does no
+# work, so callers need no branches of their own.
+
+
+class _CountingGrammar(Grammar):
+    # Counts closure computations during table construction, including
+    # closures answered from the memo cache
+    def __init__(self, **kwargs):
+        self.closure_calls = 0
+        self.lr0_closure_calls = 0
+        super().__init__(**kwargs)
+
+    def closure(self, kernel):
+        self.closure_calls += 1
+        return super().closure(kernel)
+
+    def lr0_closure(self, kernel):
+        self.lr0_closure_calls += 1
+        return super().lr0_closure(kernel)
+
+
+class CountingTable:
+    # Parse table wrapper that counts what the LR driver asks of it. The
+    # driver looks up one action per step and one goto per reduction, which
+    # is enough to follow the stack depth without touching the stack.
+    # A miss is an action lookup with no explicit table entry, answered by
+    # the state's default reduction or an error.
+    def __init__(self, table):
+        self.table = table
+        self.terminal_ids = table.terminal_ids
+        self.non_terminal_ids = table.non_terminal_ids
+        self.rule_lhs = table.rule_lhs
+        self.rule_len = table.rule_len
+        self.shifts = 0
+        self.reduces = [0] * len(table.rule_len)
+        self.action_lookups = 0
+        self.action_misses = 0
+        self.goto_misses = 0
+        self.errors = 0
+        self.depth = 1
+        self.max_depth = 1
+
+    def action(self, state, terminal_id):
+        code = self.table.action(state, terminal_id)
+        self.action_lookups += 1
+        if not self.table.has_action(state, terminal_id):
+            self.action_misses += 1
+
+        if code > 0:
+            self.shifts += 1
+            self.depth += 1
+            if self.depth > self.max_depth:
+                self.max_depth = self.depth
+        elif code < 0:
+            rule_index = -code - 1
+            self.reduces[rule_index] += 1
+            self.depth -= self.rule_len[rule_index]
+        else:
+            self.errors += 1
+        return code
+
+    def goto(self, state, non_terminal_id):
+        target = self.table.goto(state, non_terminal_id)
+        if target < 0:
+            self.goto_misses += 1
+        else:
+            self.depth += 1
+            if self.depth > self.max_depth:
+                self.max_depth = self.depth
+        return target
+
+
+class Instrumentation:
+    # Collects per-phase wall time and allocations, LR driver counters and
+    # table construction statistics, and reports them as JSON
+    enabled = True
+
+    def __init__(self):
+        self.phases = []
+        self.grammar_stats = None
+        self.parser_counters = None
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        # Time a block; allocated is the memory still held when it ends and
+        # peak the largest amount held while it ran, both relative to the
+        # start of the block
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases.append({
+                'phase': name,
+                'seconds': elapsed,
+                'allocated_bytes': current - before,
+                'peak_bytes': peak - before,
+            })
+
+    def build_grammar(self, **kwargs):
+        # Grammar(**kwargs), recording how the tables were built
+        grammar = _CountingGrammar(**kwargs)
+        built = grammar.first_iterations is not None
+        self.grammar_stats = {
+            'method': grammar.method,
+            'state_count': grammar.state_count,
+            'rules': len(grammar.rules),
+            'from_cache': not built,
+            'first_iterations': grammar.first_iterations,
+            'follow_iterations': grammar.follow_iterations,
+            'closure_calls': grammar.closure_calls if built else None,
+            'closures_computed': len(grammar._closure_cache) if built else None,
+            'lr0_closure_calls': grammar.lr0_closure_calls if built else None,
+        }
+        return grammar
+
+    def run(self, parser, tokens, lexems, **kwargs):
+        # parser.run(tokens, lexems, **kwargs) with a counting table; the
+        # counters of the last run end up in the report
+        counting = CountingTable(parser.table)
+        parser.table = counting
+        # tokens may be a generator, so count them as the parser reads
+        # them: zip pulls a token before the next number, so next(read)
+        # afterwards is the number of tokens read
+        read = count()
+        try:
+            return parser.run((token for token, _ in zip(tokens, read)), lexems, **kwargs)
+        finally:
+            parser.table = counting.table
+            rules = parser.grammar.rules
+            self.parser_counters = {
+                'tokens': next(read),
+                'shifts': counting.shifts,
+                'reduces': sum(counting.reduces),
+                'reduces_by_rule': {
+                    f"{lhs} -> {' '.join(rhs)}": times
+                    for (lhs, rhs), times in zip(rules, counting.reduces) if times
+                },
+                'max_stack_depth': counting.max_depth,
+                'action_lookups': counting.action_lookups,
+                'action_misses': counting.action_misses,
+                'goto_misses': counting.goto_misses,
+                'errors': counting.errors,
+            }
+
+    def report(self):
+        return {
+            'phases': self.phases,
+            'grammar': self.grammar_stats,
+            'parser': self.parser_counters,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+
+
+class _Disabled:
+    # Same interface as Instrumentation, doing nothing beyond the real calls
+    enabled = False
+
+    def phase(self, name):
+        return nullcontext()
+
+    def build_grammar(self, **kwargs):
+        return Grammar(**kwargs)
+
+    def run(self, parser, tokens, lexems, **kwargs):
+        return parser.run(tokens, lexems, **kwargs)
+
+    def close(self):
+        pass
+
+
+DISABLED = _Disabled()
@@ -1,125 +1,272 @@
-from grammar import Grammar
-from tokenizer import tokenize
-from LALR import LALR
-from visualizer import visualize_parse_tree
-from rich.console import Console
-from rich.table import Table
+import argparse
+import json
+import os
+import sys
+import tempfile
 import traceback
+from bisect import bisect_left
+from itertools import islice
 
-def display_tokens_by_line(code, tokens, lexems):
-    lines = code.strip().split('\n')
-    token_index = 0
-    lexeme_items = list(lexems.items())
+from instrument import DISABLED, Instrumentation
+from table_cache import DEFAULT_CACHE_DIR
+from tokenizer import LineIndex, tokenize, tokenize_with_offsets
+from LALR import LALR, ParseError
+from visualizer import write_dot
 
-    print("\nFormatted Tokens & Lexemes Per Line:\n")
+# rich, graphviz and the render cache are imported where they are used,
+# so a plain parse never loads them
 
-    for line_num, line in enumerate(lines):
-        print(f"Code Line {line_num+1}: {line.strip()}")
+# Parsed when no input file is given
+EXAMPLE = """X: integer ;
+Procedure foo( b : integer )
+b := 13;
+If x = 12 and b = 13 then
+    printf( "by copy-in copy-out" );
+elseif x = 13 and b = 13 then
+    printf( "by address" );
+else
+    printf( "A mystery" );
+end if;
+end foo"""
 
-        token_line = []
-        lexeme_line = []
 
-        while token_index < len(lexeme_items):
-            _, lexeme = lexeme_items[token_index]
+def display_tokens_by_line(code, tokens, lexems, offsets):
+    # A single pass over lines and tokens together: offsets are sorted, so
+    # the tokens of a line are the run starting before the next line does.
+    # Trailing whitespace holds no tokens, so its blank lines are not listed.
+    code = code.rstrip()
+    index = LineIndex(code)
+    starts = index.starts
+    values = [lexems.get(i, token) for i, token in enumerate(tokens)]
+    write = sys.stdout.write
+    token_index = 0
 
-            if lexeme in line:
-                token_line.append(tokens[token_index])
-                lexeme_line.append(lexeme)
-                token_index += 1
-            else:
-                break
+    write("\nFormatted Tokens & Lexemes Per Line:\n\n")
 
-        print(f"  Tokens : {' '.join(token_line)}")
-        print(f"  Lexems : {' | '.join(lexeme_line)}\n")
+    for line_num in range(1, len(index) + 1):
+        end = starts[line_num] if line_num < len(starts) else len(code) + 1
+        first = token_index
+        token_index = bisect_left(offsets, end, first)
 
-def display_parsing_steps_table(parse_output):
-    console = Console()
-    table = Table(title="Parsing Steps", show_lines=True)
+        write(f"Code Line {line_num}: {index.line_text(line_num).strip()}\n")
+        write(f"  Tokens : {' '.join(tokens[first:token_index])}\n")
+        write(f"  Lexems : {' | '.join(values[first:token_index])}\n\n")
 
-    table.add_column("Step #", justify="right", style="cyan", no_wrap=True)
-    table.add_column("Action", style="magenta")
 
-    for i, step in enumerate(parse_output):
-        table.add_row(str(i + 1), step)
-
-    console.print(table)
-
-def main():
-    # Example input code
-    code = """X: integer ;
-Procedure foo( b : integer ) 
-b := 13; 
-If x = 12 and b = 13 then 
-    printf( "by copy-in copy-out" ); 
-elseif x = 13 and b = 13 then 
-    printf( "by address" ); 
-else 
-    printf( "A mystery" ); 
-end if; 
-end foo"""
+def pages(rows, page_size):
+    # Split an iterable into lists of at most page_size items
+    rows = iter(rows)
+    while True:
+        page = list(islice(rows, page_size))
+        if not page:
+            return
+        yield page
 
-    # Tokenize input
-    tokens, lexems = tokenize(code)
 
-    # Pretty print tokens and lexems
-    def display_token_lexem_table(tokens, lexems):
-        console = Console()
+def display_token_lexem_table(tokens, lexems, page_size=1000):
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    rows = ((idx, token, lexems.get(idx, "")) for idx, token in enumerate(tokens))
+    for page in pages(rows, page_size):
         table = Table(title="Formatted Tokens and Lexems")
 
         table.add_column("Index", justify="right", style="cyan", no_wrap=True)
         table.add_column("Token", style="magenta")
         table.add_column("Lexem", style="green")
 
-        for idx, token in enumerate(tokens):
-            lex = lexems.get(idx, "")
+        for idx, token, lex in page:
             table.add_row(str(idx), token, lex)
 
         console.print(table)
 
-    # Call the new table-rendering function
-    display_token_lexem_table(tokens, lexems)
 
-    # Line-by-line visual token & lexeme output ---
-    display_tokens_by_line(code, tokens, lexems)
+def display_parsing_steps_table(parse_output, page_size=1000):
+    # Rich lays a table out only once it has every row, so long traces are
+    # printed as a series of tables of page_size steps each
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    for page in pages(enumerate(parse_output), page_size):
+        table = Table(title="Parsing Steps", show_lines=True)
+
+        table.add_column("Step #", justify="right", style="cyan", no_wrap=True)
+        table.add_column("Action", style="magenta")
+
+        for i, step in page:
+            table.add_row(str(i + 1), step)
+
+        console.print(table)
+
+
+def stream_parsing_steps(parse_output, out=None):
+    # Plain text, one line per step, written as the steps are formatted
+    write = (out or sys.stdout).write
+    for i, step in enumerate(parse_output):
+        write(f"{i + 1:>8}  {step}\n")
+
+
+def read_source(path):
+    if path is None:
+        return '<example>', EXAMPLE
+    if path == '-':
+        return '<stdin>', sys.stdin.read()
+    with open(path, encoding='utf-8') as f:
+        return path, f.read()
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(
+        description="Tokenize and parse a program, optionally showing tables, steps and the parse tree.")
+    arg_parser.add_argument('path', nargs='?',
+                            help="source file, or - for stdin (default: the built-in example)")
+    arg_parser.add_argument('--format', choices=('text', 'json'), default='text',
+                            help="output format of the result (default: %(default)s)")
+    arg_parser.add_argument('-q', '--quiet', action='store_true',
+                            help="print nothing; the exit status tells whether the input parsed")
+    arg_parser.add_argument('--method', choices=('lr1', 'lalr'), default='lr1',
+                            help="table construction method")
+    arg_parser.add_argument('--tokens', action='store_true', help="show the token tables")
+    arg_parser.add_argument('--tables', action='store_true', help="show the ACTION and GOTO tables")
+    arg_parser.add_argument('--steps', action='store_true', help="show the parsing steps")
+    arg_parser.add_argument('--rich', action='store_true',
+                            help="draw tokens and steps as Rich tables instead of plain text")
+    arg_parser.add_argument('--page-size', type=int, default=1000,
+                            help="rows per Rich table (default: %(default)s)")
+    arg_parser.add_argument('--tree', metavar='PNG',
+                            help="render the parse tree to this image with Graphviz")
+    arg_parser.add_argument('--dot', metavar='PATH', help="write the parse tree as DOT text")
+    arg_parser.add_argument('--no-render-cache', action='store_true',
+                            help="run Graphviz even if the same tree was rendered before")
+    arg_parser.add_argument('--all', action='store_true',
+                            help="show everything, as the original demo did: "
+                                 "--tokens --tables --steps --rich --tree parse_tree.png")
+    arg_parser.add_argument('--profile', metavar='PATH',
+                            help="write phase timings, parser counters and table stats to PATH as JSON")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.all:
+        args.tokens = args.tables = args.steps = args.rich = True
+        args.tree = args.tree or 'parse_tree.png'
+    if args.quiet or args.format == 'json':
+        # Nothing but the result goes to stdout
+        args.tokens = args.tables = args.steps = False
+    text = args.format == 'text' and not args.quiet
+    instrumentation = Instrumentation() if args.profile else DISABLED
 
-    # Initialize grammar and parser
     try:
-        print("\nInitializing grammar and parser...")
-        grammar = Grammar()
-        parser = LALR(grammar)
-        grammar.print_parse_table()
-
-        # Parse the input
-        print("\nParsing the input...")
-        result, parse_output = parser.parse(tokens.copy())
-
-        # Print parsing output
-        print("\nParsing Output:")
-        display_parsing_steps_table(parse_output)
-
-        if "Accept" in parse_output:
-            print("\nParsing Successful!")
-
-            # Build and visualize parse tree
-            print("\nBuilding parse tree...")
-            try:
-                parse_tree = parser.build_parse_tree(tokens.copy(), lexems)
-
-                if parse_tree:
-                    print("\nParse Tree:")
-                    tree_visual = visualize_parse_tree(parse_tree)
-                    tree_visual.render('parse_tree', format='png', cleanup=True)
-                    print("\nParse tree image generated: parse_tree.png")
-                else:
-                    print("\nFailed to build parse tree.")
-            except Exception as e:
-                print(f"\nError building parse tree: {e}")
+        source, code = read_source(args.path)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    # Tokenize input
+    with instrumentation.phase('tokenize'):
+        if args.tokens:
+            tokens, lexems, offsets = tokenize_with_offsets(code)
         else:
-            print("\nParsing Failed.")
+            tokens, lexems = tokenize(code)
+
+    if args.tokens:
+        if args.rich:
+            display_token_lexem_table(tokens, lexems, args.page_size)
+        # Line-by-line visual token & lexeme output
+        display_tokens_by_line(code, tokens, lexems, offsets)
+
+    result = {'source': source, 'ok': False, 'error': None, 'tokens': len(tokens)}
+    temp_dot = None
+    try:
+        # Initialize grammar and parser
+        with instrumentation.phase('table_build'):
+            grammar = instrumentation.build_grammar(cache_dir=DEFAULT_CACHE_DIR, method=args.method)
+            parser = LALR(grammar)
+        result['method'] = grammar.method
+        result['states'] = grammar.state_count
+        if args.tables:
+            print(f"Parser has {grammar.state_count} states ({grammar.method})")
+            grammar.print_parse_table()
+
+        # Parse the input; the step trace is only recorded when it is shown
+        try:
+            with instrumentation.phase('parse'):
+                parse_tree, trace = instrumentation.run(parser, tokens, lexems, trace=args.steps)
+        except ParseError as e:
+            parse_tree, trace = None, e.trace
+            result['error'] = str(e)
+        result['ok'] = parse_tree is not None
+
+        # Lay the tree out as DOT and let Graphviz render it in the
+        # background while the parsing steps are printed
+        renderer = None
+        if parse_tree is not None and (args.tree or args.dot):
+            if args.dot:
+                dot_path = args.dot
+            else:
+                # Only the image was asked for, so the DOT text is an
+                # intermediate file removed once Graphviz is done with it
+                fd, dot_path = tempfile.mkstemp(suffix='.dot')
+                os.close(fd)
+                temp_dot = dot_path
+            with instrumentation.phase('tree_layout'):
+                write_dot(parse_tree, dot_path)
+            if args.tree:
+                from render_cache import RenderCache, start_render
+                image_format = os.path.splitext(args.tree)[1][1:] or 'png'
+                cache = None if args.no_render_cache else RenderCache()
+                try:
+                    renderer = start_render(dot_path, args.tree, format=image_format, cache=cache)
+                except OSError as e:
+                    print(f"Error rendering parse tree: {e}", file=sys.stderr)
+
+        if args.steps:
+            print("\nParsing Output:")
+            if args.rich:
+                display_parsing_steps_table(parser.format_trace(trace), args.page_size)
+            else:
+                stream_parsing_steps(parser.format_trace(trace))
+
+        if renderer is not None:
+            with instrumentation.phase('render'):
+                rendered = renderer.wait()
+            if rendered.ok:
+                result['tree'] = args.tree
+                result['tree_cached'] = rendered.cached
+            else:
+                print(f"Error rendering parse tree: {rendered.error}", file=sys.stderr)
 
     except Exception as e:
-        print(f"\nError: {e}")
-        traceback.print_exc()
+        result['error'] = f"{type(e).__name__}: {e}"
+        if text:
+            traceback.print_exc()
+    finally:
+        if temp_dot is not None:
+            os.remove(temp_dot)
+
+    if args.format == 'json' and not args.quiet:
+        json.dump(result, sys.stdout)
+        print()
+    elif text:
+        if result['ok']:
+            print(f"\nParsing Successful! ({source}, {len(tokens)} tokens)")
+            if 'tree' in result:
+                cached = " (from the render cache)" if result['tree_cached'] else ""
+                print(f"Parse tree image generated: {result['tree']}{cached}")
+        else:
+            print(f"\nParsing Failed: {result['error']}")
+
+    if instrumentation.enabled:
+        instrumentation.write(args.profile)
+        instrumentation.close()
+        if text:
+            print(f"Profile written to {args.profile}")
+
+    return 0 if result['ok'] else 1
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,269 @@
+from array import array
+from collections import Counter
+
+# Actions are encoded as signed ints: 0 is an error, j + 1 shifts to state j
+# and -(r + 1) reduces by rule r. Reducing by rule 0 (the augmented start
+# rule) in state 0 is how the parser accepts, so ('accept',) encodes as -1.
+ERROR = 0
+
+
+def encode_action(entry):
+    if entry is None:
+        return ERROR
+    if entry[0] == 'shift':
+        return entry[1] + 1
+    if entry[0] == 'reduce':
+        return -(entry[1] + 1)
+    if entry[0] == 'accept':
+        return -1
+    return ERROR
+
+
+def pack_rows(rows, width):
+    # Row-displacement ("comb") compression: every sparse row is placed at a
+    # base offset into one shared value array so that its entries land on
+    # free slots. check[i] records which row owns slot i.
+    base = array('i', [-1] * len(rows))
+    values = array('i')
+    check = array('i')
+
+    # Dense rows are hardest to place, so place them first
+    order = sorted((state for state, row in enumerate(rows) if row),
+                   key=lambda state: -len(rows[state]))
+    first_free = 0
+    # Rows with the same columns can never share an offset, so resume the
+    # search for a repeated pattern where the previous one was placed
+    last_offset = {}
+    for state in order:
+        columns = tuple(sorted(rows[state]))
+        offset = max(0, first_free - columns[0], last_offset.get(columns, -1) + 1)
+        while True:
+            for column in columns:
+                slot = offset + column
+                if slot < len(check) and check[slot] != -1:
+                    break
+            else:
+                break
+            offset += 1
+
+        needed = offset + columns[-1] + 1 - len(check)
+        if needed > 0:
+            values.extend([ERROR] * needed)
+            check.extend([-1] * needed)
+        for column in columns:
+            values[offset + column] = rows[state][column]
+            check[offset + column] = state
+        base[state] = offset
+        last_offset[columns] = offset
+
+        while first_free < len(check) and check[first_free] != -1:
+            first_free += 1
+
+    # Pad so that base + column never runs past the end of the arrays
+    padding = max(base, default=-1) + width - len(check)
+    if padding > 0:
+        values.extend([ERROR] * padding)
+        check.extend([-1] * padding)
+
+    return base, values, check
+
+
+class CompactTable:
+    def __init__(self, grammar):
+        # Intern symbols to small ints
+        self.terminals = sorted(grammar.terminals)
+        self.terminal_ids = {term: idx for idx, term in enumerate(self.terminals)}
+        self.non_terminals = sorted(grammar.non_terminals)
+        self.non_terminal_ids = {nt: idx for idx, nt in enumerate(self.non_terminals)}
+
+        self.rule_lhs = array('H', (self.non_terminal_ids[lhs] for lhs, _ in grammar.rules))
+        self.rule_len = array('H', (len(rhs) for _, rhs in grammar.rules))
+
+        states = set(state for state, _ in grammar.action) | set(state for state, _ in grammar.goto)
+        self.state_count = max(states) + 1 if states else 0
+
+        action_rows = [{} for _ in range(self.state_count)]
+        for (state, term), entry in grammar.action.items():
+            action_rows[state][self.terminal_ids[term]] = encode_action(entry)
+
+        goto_rows = [{} for _ in range(self.state_count)]
+        for (state, nt), target in grammar.goto.items():
+            goto_rows[state][self.non_terminal_ids[nt]] = target
+
+        # Default reductions: the most common reduction of a state becomes
+        # its default and is dropped from the row. States left with an
+        # empty row reduce without looking at the lookahead at all. Rule 0
+        # is never a default, so acceptance still requires '$'.
+        self.defaults = array('i', [ERROR] * self.state_count)
+        for state, row in enumerate(action_rows):
+            reductions = Counter(code for code in row.values() if code < -1)
+            if reductions:
+                default = reductions.most_common(1)[0][0]
+                self.defaults[state] = default
+                action_rows[state] = {term: code for term, code in row.items() if code != default}
+
+        self.action_base, self.action_values, self.action_check = pack_rows(action_rows, len(self.terminals))
+        self.goto_base, self.goto_values, self.goto_check = pack_rows(goto_rows, len(self.non_terminals))
+
+    def action(self, state, terminal_id):
+        base = self.action_base[state]
+        if base < 0:
+            return self.defaults[state]
+        slot = base + terminal_id
+        if self.action_check[slot] == state:
+            return self.action_values[slot]
+        return self.defaults[state]
+
+    def has_action(self, state, terminal_id):
+        # Whether action() finds an explicit entry rather than falling back
+        # to the state's default reduction or an error
+        base = self.action_base[state]
+        return base >= 0 and self.action_check[base + terminal_id] == state
+
+    def goto(self, state, non_terminal_id):
+        base = self.goto_base[state]
+        if base >= 0 and self.goto_check[base + non_terminal_id] == state:
+            return self.goto_values[base + non_terminal_id]
+        return -1
+
+    def memory_usage(self):
+        # Bytes held by the table buffers
+        buffers = (self.rule_lhs, self.rule_len, self.defaults,
+                   self.action_base, self.action_values, self.action_check,
+                   self.goto_base, self.goto_values, self.goto_check)
+        return sum(len(buf) * buf.itemsize for buf in buffers)
+
+
+class DictTable:
+    # The same lookup interface over the grammar's dict tables, with symbols
+    # standing for themselves; used to compare against CompactTable
+    def __init__(self, grammar):
+        self.actions = grammar.action
+        self.gotos = grammar.goto
+        self.terminal_ids = {term: term for term in grammar.terminals}
+        self.non_terminal_ids = {nt: nt for nt in grammar.non_terminals}
+        self.rule_lhs = [lhs for lhs, _ in grammar.rules]
+        self.rule_len = [len(rhs) for _, rhs in grammar.rules]
+
+    def action(self, state, terminal):
+        return encode_action(self.actions.get((state, terminal)))
+
+    def has_action(self, state, terminal):
+        return (state, terminal) in self.actions
+
+    def goto(self, state, non_terminal):
+        return self.gotos.get((state, non_terminal), -1)
+
+
+class LazyTable:
+    # The CompactTable lookup interface over an LR(1) automaton that is
+    # built as the parser explores it. A state is numbered when it first
+    # appears as a GOTO target, but its closure and ACTION/GOTO row are
+    # only computed the first time the parser is in it. State numbers
+    # follow the order of discovery, so they match those of
+    # Grammar.build_parsing_table only if warm() runs before any parse;
+    # conflicts resolve the same way either way.
+    def __init__(self, grammar):
+        self.grammar = grammar
+        if getattr(grammar, 'rule_rhs', None) is None:
+            grammar.index_items()
+
+        # Terminal ids are positions in the sorted terminals, as in
+        # CompactTable, which makes them the grammar's lookahead ids too
+        self.terminals = grammar.terminal_list
+        self.terminal_ids = grammar.terminal_ids
+        self.non_terminals = sorted(grammar.non_terminals)
+        self.non_terminal_ids = {nt: idx for idx, nt in enumerate(self.non_terminals)}
+        self.rule_lhs = array('H', (self.non_terminal_ids[lhs] for lhs, _ in grammar.rules))
+        self.rule_len = array('H', (len(rhs) for _, rhs in grammar.rules))
+
+        start_kernel = frozenset({(grammar.pack_core(0, 0), frozenset({self.terminal_ids['$']}))})
+        self.kernels = [start_kernel]
+        self.state_ids = {start_kernel: 0}
+        # Rows of states not materialized yet are None
+        self.action_rows = [None]
+        self.goto_rows = [None]
+        self.materialized = 0
+
+    def _materialize(self, state):
+        grammar = self.grammar
+        items = grammar.closure(self.kernels[state])
+        actions = {}
+        gotos = {}
+        terminal_ids = self.terminal_ids
+        for X, kernel in sorted(grammar.goto_kernels(items).items()):
+            target = self.state_ids.get(kernel)
+            if target is None:
+                target = self.state_ids[kernel] = len(self.kernels)
+                self.kernels.append(kernel)
+                self.action_rows.append(None)
+                self.goto_rows.append(None)
+            if X in terminal_ids:
+                actions[terminal_ids[X]] = target + 1
+            else:
+                gotos[self.non_terminal_ids[X]] = target
+
+        # Reductions overwrite shifts, as in Grammar.add_reduce_actions
+        dot_mask = (1 << grammar.dot_bits) - 1
+        for core, lookaheads in items.items():
+            rule_id = core >> grammar.dot_bits
+            if core & dot_mask == len(grammar.rule_rhs[rule_id]):
+                for lookahead in lookaheads:
+                    actions[lookahead] = -(rule_id + 1)
+
+        self.action_rows[state] = actions
+        self.goto_rows[state] = gotos
+        self.materialized += 1
+        return actions
+
+    def action(self, state, terminal_id):
+        row = self.action_rows[state]
+        if row is None:
+            row = self._materialize(state)
+        return row.get(terminal_id, ERROR)
+
+    def has_action(self, state, terminal_id):
+        row = self.action_rows[state]
+        if row is None:
+            row = self._materialize(state)
+        return terminal_id in row
+
+    def goto(self, state, non_terminal_id):
+        # The state under a reduction was visited before, so its row exists
+        if self.goto_rows[state] is None:
+            self._materialize(state)
+        return self.goto_rows[state].get(non_terminal_id, -1)
+
+    @property
+    def state_count(self):
+        # States discovered so far, materialized or not
+        return len(self.kernels)
+
+    def warm(self):
+        # Materialize every reachable state; returns the state count
+        state = 0
+        while state < len(self.kernels):
+            if self.action_rows[state] is None:
+                self._materialize(state)
+            state += 1
+        return len(self.kernels)
+
+    def freeze(self):
+        # warm(), then store the complete tables on the grammar in its usual
+        # dict form and return them packed as a CompactTable
+        self.warm()
+        grammar = self.grammar
+        grammar.action = {}
+        grammar.goto = {}
+        for state, row in enumerate(self.action_rows):
+            for terminal_id, code in row.items():
+                if code > 0:
+                    entry = ('shift', code - 1)
+                else:
+                    entry = ('reduce', -code - 1)
+                grammar.action[(state, self.terminals[terminal_id])] = entry
+        for state, row in enumerate(self.goto_rows):
+            for non_terminal_id, target in row.items():
+                grammar.goto[(state, self.non_terminals[non_terminal_id])] = target
+        grammar.state_count = len(self.kernels)
+        return CompactTable(grammar)
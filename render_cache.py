@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from table_cache import atomic_write
+from visualizer import render_dot
+
+# Rendered images keyed by a hash of the DOT text, the output format and
+# the layout engine, so an unchanged tree skips Graphviz. Entries are
+# plain files in cache_dir; a hit refreshes the entry's mtime, and when
+# the directory grows past max_bytes the least recently used entries are
+# removed.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.render_cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Outcome of one render; cached tells whether Graphviz was skipped
+RenderResult = namedtuple('RenderResult', ['dot_path', 'output_path', 'ok', 'cached', 'error'])
+
+
+def render_key(dot_path, format='png', engine='dot'):
+    h = hashlib.sha256()
+    h.update(f"{engine} {format}\n".encode())
+    with open(dot_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key, format):
+        return os.path.join(self.cache_dir, f"{key[:32]}.{format}")
+
+    def fetch(self, key, format, output_path):
+        # Copy a cached image to output_path; False on a miss
+        entry = self.entry_path(key, format)
+        try:
+            shutil.copyfile(entry, output_path)
+            os.utime(entry)
+        except FileNotFoundError:
+            # Missing, or evicted by another process meanwhile
+            return False
+        return True
+
+    def store(self, key, format, image_path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(image_path, 'rb') as f:
+            atomic_write(self.entry_path(key, format), f.read())
+        self.evict()
+
+    def entries(self):
+        # (mtime, size, path) of every entry, oldest first
+        try:
+            scanned = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return []
+        entries = []
+        for entry in scanned:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        # Remove least recently used entries until the cache fits
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class PendingRender:
+    # A render started by start_render: served from the cache or a
+    # visualizer.DotProcess running in the background. wait() returns a
+    # RenderResult.
+    def __init__(self, dot_path, output_path, format, cache, key, process):
+        self.dot_path = dot_path
+        self.output_path = output_path
+        self.format = format
+        self.cache = cache
+        self.key = key
+        self.process = process
+
+    def wait(self):
+        if self.process is None:
+            return RenderResult(self.dot_path, self.output_path, True, True, None)
+        ok, error = self.process.wait()
+        if not ok:
+            return RenderResult(self.dot_path, self.output_path, False, False, error)
+        if self.cache is not None:
+            try:
+                self.cache.store(self.key, self.format, self.output_path)
+            except OSError:
+                pass  # the image is there; only caching it failed
+        return RenderResult(self.dot_path, self.output_path, True, False, None)
+
+
+def start_render(dot_path, output_path, format='png', engine='dot', cache=None):
+    # Like visualizer.render_dot, but a cache hit copies the stored image
+    # instead of starting Graphviz. Raises OSError if the engine cannot be
+    # started.
+    key = None
+    if cache is not None:
+        key = render_key(dot_path, format, engine)
+        if cache.fetch(key, format, output_path):
+            return PendingRender(dot_path, output_path, format, cache, key, None)
+    process = render_dot(dot_path, output_path, format, engine)
+    return PendingRender(dot_path, output_path, format, cache, key, process)
+
+
+def _render(dot_path, output_path, format, engine, cache):
+    try:
+        return start_render(dot_path, output_path, format, engine, cache).wait()
+    except OSError as e:
+        return RenderResult(dot_path, output_path, False, False, f"{type(e).__name__}: {e}")
+
+
+def render_many(jobs, workers=None, format='png', engine='dot', cache=None):
+    # Render (dot_path, output_path) pairs with at most `workers` Graphviz
+    # processes at a time (default: one per CPU), yielding a RenderResult
+    # per job in completion order. The threads only wait on their
+    # processes, so they do not contend for the GIL.
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render, dot_path, output_path, format, engine, cache)
+                   for dot_path, output_path in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Render DOT files with Graphviz through the render cache.")
+    arg_parser.add_argument('paths', nargs='*', help="DOT files; each is rendered next to itself")
+    arg_parser.add_argument('-T', '--format', default='png', help="output format (default: %(default)s)")
+    arg_parser.add_argument('--engine', default='dot', help="Graphviz layout engine (default: %(default)s)")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="concurrent Graphviz processes (default: one per CPU)")
+    arg_parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 2 ** 20,
+                            help="cache size limit in MiB (default: %(default)s)")
+    arg_parser.add_argument('--no-cache', action='store_true', help="always run Graphviz")
+    arg_parser.add_argument('--clear', action='store_true', help="empty the cache first")
+    args = arg_parser.parse_args()
+
+    cache = RenderCache(max_bytes=int(args.max_mb * 2 ** 20))
+    if args.clear:
+        cache.clear()
+    jobs = [(path, f"{os.path.splitext(path)[0]}.{args.format}") for path in args.paths]
+
+    failures = 0
+    results = render_many(jobs, workers=args.workers, format=args.format, engine=args.engine,
+                          cache=None if args.no_cache else cache)
+    for result in results:
+        if result.ok:
+            print(f"{'cached' if result.cached else 'ok':<7}{result.output_path}")
+        else:
+            failures += 1
+            print(f"error  {result.dot_path}: {result.error}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
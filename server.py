@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+import batch
+from LALR import ParseError
+from table_cache import DEFAULT_CACHE_DIR
+from tokenizer import tokenize
+
+# A long-running parse service speaking JSON lines over a Unix socket or
+# stdin/stdout. Each request is one object per line:
+#
+#   {"id": 7, "source": "X: integer ; ..."}      or   {"id": 7, "path": "prog.src"}
+#
+# optionally with "steps": true for the formatted parsing steps. Each
+# response is one line with the same id:
+#
+#   {"id": 7, "ok": true, "tokens": 54, "nodes": 136, "error": null, "elapsed_ms": 0.9}
+#
+# Responses are written as parses finish, so they can arrive out of order.
+
+# Largest request line accepted
+MAX_LINE = 1 << 24
+
+
+def _parse_request(source, path, steps):
+    # Runs in a worker process; returns the response fields
+    if path is not None:
+        try:
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+        except OSError as e:
+            return {'ok': False, 'tokens': 0, 'nodes': 0, 'error': f"{type(e).__name__}: {e}"}
+
+    # The pool comes from batch.make_pool, so the parser is batch's
+    parser = batch._parser
+    tokens, lexems = tokenize(source)
+    try:
+        tree, records = parser.run(tokens, lexems, trace=steps, tree='flat')
+    except ParseError as e:
+        response = {'ok': False, 'tokens': len(tokens), 'nodes': 0, 'error': str(e)}
+        records = e.trace or []
+    except Exception as e:
+        return {'ok': False, 'tokens': len(tokens), 'nodes': 0, 'error': f"{type(e).__name__}: {e}"}
+    else:
+        response = {'ok': True, 'tokens': len(tokens), 'nodes': len(tree.tree), 'error': None}
+    if steps:
+        response['steps'] = list(parser.format_trace(records))
+    return response
+
+
+class ParseService:
+    def __init__(self, workers=None, max_pending=64, timeout=10.0,
+                 cache_dir=DEFAULT_CACHE_DIR, method='lr1'):
+        # Build (or load) the tables once; forked workers inherit them
+        batch.load_parser(cache_dir, method)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.slots = None
+
+        if workers == 0:
+            self.pool = None
+        else:
+            self.pool = batch.make_pool(workers, cache_dir, method)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        # Serve one connection. At most max_pending requests are in flight
+        # across all connections; once they are, no more lines are read,
+        # so clients are held back by the socket buffers filling up.
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_pending)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await self.slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Line over MAX_LINE, or the client went away
+                    self.slots.release()
+                    break
+                if not line:
+                    self.slots.release()
+                    break
+                task = asyncio.create_task(self.respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer, write_lock):
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            source, path = request.get('source'), request.get('path')
+            if (source is None) == (path is None):
+                raise ValueError("exactly one of 'source' and 'path' is required")
+            response = await self.parse(source, path, bool(request.get('steps')))
+        except asyncio.TimeoutError:
+            response = {'ok': False, 'error': f"timed out after {self.timeout} s"}
+        except (ValueError, AttributeError) as e:
+            response = {'ok': False, 'error': f"bad request: {e}"}
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self.slots.release()
+
+        response = {'id': request_id, **response,
+                    'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)}
+        async with write_lock:
+            try:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def parse(self, source, path, steps):
+        if self.pool is None:
+            return _parse_request(source, path, steps)
+        # A timed-out parse still runs to completion in its worker; only
+        # the response is given up on
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, _parse_request, source, path, steps)
+        return await asyncio.wait_for(future, self.timeout)
+
+
+async def serve_unix(service, path):
+    if os.path.exists(path):
+        os.remove(path)
+    server = await asyncio.start_unix_server(service.handle, path=path, limit=MAX_LINE)
+    # Stop cleanly on SIGTERM as well as Ctrl-C
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    print(f"listening on {path}", file=sys.stderr, flush=True)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class _StdoutWriter:
+    # The StreamWriter calls handle() needs, as blocking writes to stdout,
+    # which may be a regular file that asyncio cannot watch
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+
+    async def drain(self):
+        sys.stdout.buffer.flush()
+
+    def close(self):
+        sys.stdout.buffer.flush()
+
+
+async def serve_stdio(service):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=MAX_LINE)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except ValueError:
+        # Redirected from a regular file: nothing to wait for, read it whole
+        reader.feed_data(sys.stdin.buffer.read())
+        reader.feed_eof()
+    await service.handle(reader, _StdoutWriter())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve parse requests as JSON lines.")
+    where = arg_parser.add_mutually_exclusive_group()
+    where.add_argument('--socket', metavar='PATH', help="listen on this Unix socket")
+    where.add_argument('--stdio', action='store_true', help="serve stdin/stdout (the default)")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="worker processes (default: one per CPU, 0: parse in the event loop)")
+    arg_parser.add_argument('--max-pending', type=int, default=64,
+                            help="requests in flight before reading stops (default: %(default)s)")
+    arg_parser.add_argument('--timeout', type=float, default=10.0,
+                            help="seconds before a request is answered with a timeout error")
+    arg_parser.add_argument('--method', choices=('lr1', 'lalr'), default='lr1',
+                            help="table construction method")
+    args = arg_parser.parse_args()
+
+    service = ParseService(workers=args.workers, max_pending=args.max_pending,
+                           timeout=args.timeout, method=args.method)
+    try:
+        if args.socket:
+            asyncio.run(serve_unix(service, args.socket))
+        else:
+            asyncio.run(serve_stdio(service))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bump whenever the layout of the cached payload changes
+CACHE_VERSION = 2
+CACHE_MAGIC = b'LRTC'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.table_cache')
+
+
+def grammar_fingerprint(grammar):
+    # Hash everything the tables are derived from
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION} {grammar.method}\n".encode())
+    for lhs, rhs in grammar.rules:
+        h.update(f"{lhs} -> {' '.join(rhs)}\n".encode())
+    h.update(' '.join(sorted(grammar.terminals)).encode() + b'\n')
+    h.update(' '.join(sorted(grammar.non_terminals)).encode() + b'\n')
+    return h.hexdigest()
+
+
+def cache_path(grammar, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"tables-{grammar_fingerprint(grammar)[:32]}.bin")
+
+
+def load_tables(grammar, cache_dir=DEFAULT_CACHE_DIR):
+    # Returns the cached tables, or None if missing, stale or corrupt
+    fingerprint = grammar_fingerprint(grammar)
+    path = cache_path(grammar, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    header_len = len(CACHE_MAGIC) + 32
+    if len(data) < header_len or not data.startswith(CACHE_MAGIC):
+        return None
+    digest, body = data[len(CACHE_MAGIC):header_len], data[header_len:]
+    if hashlib.sha256(body).digest() != digest:
+        return None
+
+    try:
+        payload = pickle.loads(body)
+    except Exception:
+        return None
+
+    if not isinstance(payload, dict):
+        return None
+    if payload.get('version') != CACHE_VERSION or payload.get('fingerprint') != fingerprint:
+        return None
+    return payload
+
+
+def atomic_write(path, data):
+    # Write to a temporary file first so readers never see a partial file.
+    # The temporary name is the target's with a leading dot and a random
+    # suffix, in the same directory so the rename stays on one filesystem.
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=f'.{name}-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_tables(grammar, cache_dir=DEFAULT_CACHE_DIR):
+    payload = {
+        'version': CACHE_VERSION,
+        'fingerprint': grammar_fingerprint(grammar),
+        'action': grammar.action,
+        'goto': grammar.goto,
+        'first': dict(grammar.first),
+        'follow': dict(grammar.follow),
+        'state_count': grammar.state_count,
+    }
+    body = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    data = CACHE_MAGIC + hashlib.sha256(body).digest() + body
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(grammar, cache_dir)
+    atomic_write(path, data)
+    return path
+
+
+def clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.startswith('tables-') or name.startswith('.tables-'):
+            os.remove(os.path.join(cache_dir, name))
@@ -1,36 +1,299 @@
+import mmap
 import re
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+from itertools import accumulate
 
-def tokenize(pseudocode):
-    token_specification = [
-        ('procedure', r'[Pp]rocedure'),
-        ('if', r'[Ii]f'),
-        ('then', r'then'),
-        ('elseif', r'[Ee]lseif'),
-        ('else', r'else'),
-        ('end', r'end'),
-        ('integer', r'integer'),
-        ('printf', r'printf'),
-        ('and', r'and'),
-        ('ASSIGN', r':='),
-        ('COLON', r':'),
-        ('SEMI', r';'),
-        ('LPAREN', r'\('),
-        ('RPAREN', r'\)'),
-        ('EQ', r'='),
-        ('id', r'[a-zA-Z_][a-zA-Z_0-9]*'),
-        ('num', r'\d+'),
-        ('str', r'"[^"]*"'),
-        ('WHITESPACE', r'[ \t\n]+'),
-    ]
-    tok_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification)
+# A scanned token; offset is the absolute position of the first character
+# (in bytes for binary sources), line and column are 1-based
+Token = namedtuple('Token', ['type', 'value', 'offset', 'line', 'column'])
+
+# Identifiers are matched once, longest first, and then classified with a
+# dict lookup, so `iffy` and `endpoint` stay single identifiers
+KEYWORDS = {
+    'procedure': 'procedure', 'Procedure': 'procedure',
+    'if': 'if', 'If': 'if',
+    'then': 'then',
+    'elseif': 'elseif', 'Elseif': 'elseif',
+    'else': 'else',
+    'end': 'end',
+    'integer': 'integer',
+    'printf': 'printf',
+    'and': 'and',
+}
+
+OPERATORS = {
+    ':=': 'ASSIGN',
+    ':': 'COLON',
+    ';': 'SEMI',
+    '(': 'LPAREN',
+    ')': 'RPAREN',
+    '=': 'EQ',
+}
+
+# Every alternative starts with a different class of character, so the
+# first character selects the branch without backtracking. Whitespace has
+# no alternative: the regex engine skips it while searching for the next
+# token, as it does any other character that starts no token.
+TOKEN_REGEX = (
+    r'(?P<word>[a-zA-Z_][a-zA-Z_0-9]*)'
+    r'|(?P<op>:=|[:;()=])'
+    r'|(?P<num>\d+)'
+    r'|(?P<str>"[^"]*")'
+)
+TOKEN_PATTERN = re.compile(TOKEN_REGEX)
+BYTES_TOKEN_PATTERN = re.compile(TOKEN_REGEX.encode())
+
+CHUNK_SIZE = 1 << 16
+
+# Token types by id, for TokenStream; the ids fit in a byte
+TOKEN_TYPES = tuple(dict.fromkeys([*KEYWORDS.values(), *OPERATORS.values(), 'id', 'num', 'str']))
+TYPE_IDS = {kind: type_id for type_id, kind in enumerate(TOKEN_TYPES)}
+
+
+def classify(kind, value):
+    # Token type for a match of TOKEN_PATTERN, given its group name and text
+    if kind == 'word':
+        return KEYWORDS.get(value, 'id')
+    if kind == 'op':
+        return OPERATORS[value]
+    return kind
+
+
+def iter_tokens(source, chunk_size=CHUNK_SIZE):
+    # Lazily scan a str, a bytes-like object, an mmap or a file object
+    # (text or binary). Files are read chunk_size at a time, so memory stays
+    # bounded by the longest token rather than the input size.
+    if hasattr(source, 'read') and not isinstance(source, mmap.mmap):
+        read = source.read
+        buf = read(chunk_size)
+        eof = not buf
+    else:
+        read = None
+        buf = source
+        eof = True
+        if not isinstance(buf, (str, bytes, mmap.mmap)):
+            # memoryview and friends lack the str methods used below;
+            # mmap is kept as is so a mapped file is never copied
+            buf = bytes(buf)
+
+    binary = not isinstance(buf, str)
+    pattern = BYTES_TOKEN_PATTERN if binary else TOKEN_PATTERN
+    newline = b'\n' if binary else '\n'
+    quote = b'"' if binary else '"'
+
+    if isinstance(buf, mmap.mmap):
+        # mmap has no count(); the gaps between tokens are short, so
+        # slicing them is cheap
+        def count(sub, start, end):
+            return buf[start:end].count(sub)
+    else:
+        count = None
+
+    base = 0  # absolute offset of buf[0]
+    pos = 0  # next position to scan in buf
+    scan = 0  # newlines before this position in buf are already counted
+    line, line_start = 1, 0
+
+    while True:
+        match = pattern.search(buf, pos)
+
+        # A match touching the end of the buffer may continue in the next
+        # chunk, and a skipped quote may start a string that closes there
+        if not eof and (match is None or match.end() == len(buf)
+                        or buf.find(quote, pos, match.start()) != -1):
+            chunk = read(chunk_size)
+            if not chunk:
+                eof = True
+                continue
+
+            # Drop consumed text, keeping the line count in step
+            newlines = buf.count(newline, scan, pos)  # file buffers are str/bytes
+            if newlines:
+                line += newlines
+                line_start = base + buf.rfind(newline, scan, pos) + 1
+            base += pos
+            buf = buf[pos:] + chunk
+            pos = scan = 0
+            continue
+
+        if match is None:
+            return
+
+        start, pos = match.span()
+        kind = match.lastgroup
+
+        newlines = (count or buf.count)(newline, scan, start)
+        if newlines:
+            line += newlines
+            line_start = base + buf.rfind(newline, scan, start) + 1
+        scan = start
+
+        value = match.group()
+        if binary:
+            value = value.decode('utf-8')
+        yield Token(classify(kind, value), value, base + start, line, base + start - line_start + 1)
+
+
+def iter_file_tokens(path):
+    # Scan a file through mmap so the OS pages it in on demand
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files cannot be mapped
+            return
+        with mapped:
+            yield from iter_tokens(mapped)
+
+
+def tokenize_with_offsets(pseudocode):
+    # Same scanner as iter_tokens, for in-memory text: token types, the
+    # lexems dict and the start offset of every token; token i spans
+    # offsets[i] to offsets[i] + len(lexems[i])
     tokens = []
-    lexems = {}
+    values = []
+    offsets = array('q')
+    keywords = KEYWORDS
+
+    for match in TOKEN_PATTERN.finditer(pseudocode):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'word':
+            kind = keywords.get(value, 'id')
+        elif kind == 'op':
+            kind = OPERATORS[value]
+        tokens.append(kind)
+        values.append(value)
+        offsets.append(match.start())
+
+    lexems = dict(enumerate(values))
+    return tokens, lexems, offsets
+
+
+def tokenize(pseudocode):
+    # tokenize_with_offsets without the offsets
+    tokens, lexems, _ = tokenize_with_offsets(pseudocode)
+    return tokens, lexems
+
+
+class TokenStream(Sequence):
+    # The tokens of a source as three parallel arrays: type ids (indexes
+    # into TOKEN_TYPES) and start and end offsets. Indexing and iterating
+    # give token type strings, so a TokenStream can stand in for the list
+    # from tokenize; `lexemes` stands in for the lexems dict, slicing each
+    # value out of the source only when it is asked for.
+    __slots__ = ('source', 'type_ids', 'starts', 'ends', 'lexemes')
+
+    def __init__(self, source, type_ids, starts, ends):
+        self.source = source
+        self.type_ids = type_ids
+        self.starts = starts
+        self.ends = ends
+        self.lexemes = _Lexemes(self)
+
+    def __len__(self):
+        return len(self.type_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TOKEN_TYPES[type_id] for type_id in self.type_ids[index]]
+        return TOKEN_TYPES[self.type_ids[index]]
+
+    def __iter__(self):
+        return map(TOKEN_TYPES.__getitem__, self.type_ids)
+
+    def span(self, i):
+        return self.starts[i], self.ends[i]
+
+    def lexeme(self, i):
+        value = self.source[self.starts[i]:self.ends[i]]
+        return value if isinstance(value, str) else str(value, 'utf-8')
+
+
+class _Lexemes(Mapping):
+    # Read-only {index: lexeme} view of a TokenStream, like tokenize's dict
+    __slots__ = ('stream',)
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __len__(self):
+        return len(self.stream)
+
+    def __iter__(self):
+        return iter(range(len(self.stream)))
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self.stream):
+            raise KeyError(i)
+        return self.stream.lexeme(i)
+
+    def get(self, i, default=None):
+        # Overridden because the drivers call it once per token
+        stream = self.stream
+        if 0 <= i < len(stream.type_ids):
+            value = stream.source[stream.starts[i]:stream.ends[i]]
+            return value if isinstance(value, str) else str(value, 'utf-8')
+        return default
+
+
+def tokenize_stream(source):
+    # Scan a str or a bytes-like source (bytes, mmap, memoryview) into a
+    # TokenStream; offsets of binary sources are in bytes. Nothing but the
+    # three arrays is kept per token.
+    binary = not isinstance(source, str)
+    pattern = BYTES_TOKEN_PATTERN if binary else TOKEN_PATTERN
+    if binary:
+        keyword_ids = {word.encode(): TYPE_IDS[kind] for word, kind in KEYWORDS.items()}
+        operator_ids = {op.encode(): TYPE_IDS[kind] for op, kind in OPERATORS.items()}
+    else:
+        keyword_ids = {word: TYPE_IDS[kind] for word, kind in KEYWORDS.items()}
+        operator_ids = {op: TYPE_IDS[kind] for op, kind in OPERATORS.items()}
+    id_id, num_id, str_id = TYPE_IDS['id'], TYPE_IDS['num'], TYPE_IDS['str']
+
+    offset_code = 'I' if len(source) < 1 << 32 else 'Q'
+    type_ids = array('B')
+    starts = array(offset_code)
+    ends = array(offset_code)
+    add_type, add_start, add_end = type_ids.append, starts.append, ends.append
+
+    # Groups of TOKEN_REGEX, in order: word, op, num, str
+    for match in pattern.finditer(source):
+        group = match.lastindex
+        if group == 1:
+            add_type(keyword_ids.get(match.group(), id_id))
+        elif group == 2:
+            add_type(operator_ids[match.group()])
+        else:
+            add_type(num_id if group == 3 else str_id)
+        start, end = match.span()
+        add_start(start)
+        add_end(end)
+
+    return TokenStream(source, type_ids, starts, ends)
+
+
+class LineIndex:
+    # Start offsets of the lines of a text, so an offset maps to its line by
+    # bisection instead of a scan. Lines and columns are 1-based, as in Token.
+    def __init__(self, text):
+        self.text = text
+        self.starts = array('q', [0])
+        self.starts.extend(accumulate(len(line) + 1 for line in text.split('\n')[:-1]))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, offset):
+        return bisect_right(self.starts, offset)
 
-    for mo in re.finditer(tok_regex, pseudocode):
-        token_type = mo.lastgroup
-        value = mo.group()
-        if token_type != 'WHITESPACE':
-            tokens.append(token_type)
-            lexems[len(tokens) - 1] = value
+    def position(self, offset):
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
 
-    return tokens, lexems
\ No newline at end of file
+    def line_text(self, line):
+        start = self.starts[line - 1]
+        end = self.starts[line] - 1 if line < len(self.starts) else len(self.text)
+        return self.text[start:end]
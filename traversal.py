@@ -0,0 +1,108 @@
+import re
+from collections import deque
+
+# Tree walks with explicit stacks, for dict trees and FlatNode views alike.
+# Parse trees of long programs are as deep as the statement list is long
+# (S -> S St), far beyond Python's recursion limit. Every generator yields
+# (node, depth) pairs with the root at depth 0.
+
+
+def preorder(root):
+    # Parents before children, children left to right
+    stack = [(root, 0)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node, depth = pop()
+        yield node, depth
+        children = node['children']
+        if children:
+            depth += 1
+            for child in reversed(children):
+                push((child, depth))
+
+
+def postorder(root):
+    # Children left to right before their parent
+    stack = [(root, 0, False)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node, depth, expanded = pop()
+        children = node['children']
+        if expanded or not children:
+            yield node, depth
+        else:
+            push((node, depth, True))
+            for child in reversed(children):
+                push((child, depth + 1, False))
+
+
+def level_order(root):
+    # Breadth first: all nodes at depth d before any at depth d + 1
+    queue = deque([(root, 0)])
+    popleft, push = queue.popleft, queue.append
+    while queue:
+        node, depth = popleft()
+        yield node, depth
+        depth += 1
+        for child in node['children']:
+            push((child, depth))
+
+
+# Characters that cannot appear in a method name, as in "P'"
+_NON_IDENTIFIER = re.compile(r'\W')
+
+# Returned by a visit_ method to skip the node's children; a unique
+# object, so no ordinary return value (False, 0, None) prunes by accident
+SKIP = object()
+
+
+class Visitor:
+    # Subclasses define visit_<symbol>(node, depth), called before the
+    # children, and leave_<symbol>(node, depth), called after them, for
+    # the symbols they handle; characters that are not valid in a name
+    # become '_' (visit_P_ for P'). Other nodes go to generic_visit and
+    # generic_leave. A visit method that returns SKIP prunes the subtree.
+    # The method lookup is done once per symbol and cached.
+    def __init__(self):
+        self._handlers = {}
+
+    def _lookup(self, symbol):
+        name = _NON_IDENTIFIER.sub('_', symbol)
+        enter = getattr(self, f'visit_{name}', self.generic_visit)
+        leave = getattr(self, f'leave_{name}', self.generic_leave)
+        # Leave markers cost a stack push per node, so only push them for
+        # symbols that do something on the way out
+        if getattr(leave, '__func__', None) is Visitor.generic_leave:
+            leave = None
+        handlers = self._handlers[symbol] = (enter, leave)
+        return handlers
+
+    def walk(self, root):
+        handlers = self._handlers
+        lookup = self._lookup
+        stack = [(root, 0, None)]
+        pop, push = stack.pop, stack.append
+        while stack:
+            node, depth, leave = pop()
+            if leave is not None:
+                leave(node, depth)
+                continue
+
+            symbol = node['symbol']
+            enter, leave = handlers.get(symbol) or lookup(symbol)
+            if leave is not None:
+                push((node, depth, leave))
+            if enter(node, depth) is SKIP:
+                continue
+
+            children = node['children']
+            if children:
+                depth += 1
+                for child in reversed(children):
+                    push((child, depth, None))
+
+    def generic_visit(self, node, depth):
+        pass
+
+    def generic_leave(self, node, depth):
+        pass
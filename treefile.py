@@ -0,0 +1,409 @@
+import argparse
+import gc
+import json
+import mmap
+import os
+import sys
+from array import array
+from itertools import chain
+
+from grammar import Grammar
+from LALR import LALR
+from tokenizer import tokenize
+
+# Binary parse-tree files. Layout, all integers unsigned LEB128 varints
+# unless noted:
+#
+#   magic 'LRPT', version byte
+#   symbol table   count, then (length, UTF-8 bytes) per symbol
+#   string pool    count, count 4-byte little-endian end offsets, then the
+#                  concatenated UTF-8 lexemes
+#   nodes          count, then every node in pre-order:
+#                    terminal      symbol_id * 2 + 1, value   (string id + 1, 0 for None)
+#                    non-terminal  symbol_id * 2, child count, byte length of its children
+#
+# The byte length lets a reader step over a subtree without decoding it,
+# so TreeReader can hand out nodes that decode themselves on first use.
+
+MAGIC = b'LRPT'
+FORMAT_VERSION = 1
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _varint_size(n):
+    size = 1
+    while n >= 0x80:
+        n >>= 7
+        size += 1
+    return size
+
+
+def _get_varint(buf, pos):
+    # (value, position after it)
+    byte = buf[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result = byte & 0x7f
+    shift = 7
+    while True:
+        pos += 1
+        byte = buf[pos]
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def dump_tree(root):
+    # Encode a dict-style tree (dict, FlatNode or TreeNode) to bytes
+    symbol_ids = {}
+    string_ids = {}
+    heads = array('Q')
+    args = array('Q')
+
+    # Pre-order pass: intern symbols and lexemes
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        symbol_id = symbol_ids.setdefault(node['symbol'], len(symbol_ids))
+        if node['type'] == 'terminal':
+            value = node.get('value')
+            heads.append(symbol_id * 2 + 1)
+            args.append(0 if value is None else string_ids.setdefault(value, len(string_ids)) + 1)
+        else:
+            children = node['children']
+            heads.append(symbol_id * 2)
+            args.append(len(children))
+            pending.extend(reversed(children))
+
+    # Subtree sizes, bottom-up: in reverse pre-order every node comes after
+    # its descendants, and its children's sizes are the top of the stack
+    count = len(heads)
+    body_sizes = array('Q', bytes(8 * count))
+    sizes = []
+    for i in range(count - 1, -1, -1):
+        head, arg = heads[i], args[i]
+        if head & 1:
+            sizes.append(_varint_size(head) + _varint_size(arg))
+        else:
+            body = 0
+            for _ in range(arg):
+                body += sizes.pop()
+            body_sizes[i] = body
+            sizes.append(_varint_size(head) + _varint_size(arg) + _varint_size(body) + body)
+
+    out = bytearray(MAGIC)
+    out.append(FORMAT_VERSION)
+    _put_varint(out, len(symbol_ids))
+    for symbol in symbol_ids:
+        encoded = symbol.encode('utf-8')
+        _put_varint(out, len(encoded))
+        out += encoded
+
+    blobs = [value.encode('utf-8') for value in string_ids]
+    _put_varint(out, len(blobs))
+    end = 0
+    for blob in blobs:
+        end += len(blob)
+        out += end.to_bytes(4, 'little')
+    out += b''.join(blobs)
+
+    _put_varint(out, count)
+    for i in range(count):
+        head = heads[i]
+        _put_varint(out, head)
+        _put_varint(out, args[i])
+        if not head & 1:
+            _put_varint(out, body_sizes[i])
+    return bytes(out)
+
+
+def write_tree(root, path):
+    data = dump_tree(root)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+class TreeReader:
+    # A tree file mapped into memory. Only the symbol table is decoded when
+    # the file is opened; nodes and lexemes are decoded as they are visited.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self.buf.close()
+            raise
+
+    def _read_header(self):
+        buf = self.buf
+        if buf[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a parse tree file")
+        if buf[len(MAGIC)] != FORMAT_VERSION:
+            raise ValueError(f"unsupported tree file version {buf[len(MAGIC)]}")
+        pos = len(MAGIC) + 1
+
+        count, pos = _get_varint(buf, pos)
+        symbols = []
+        for _ in range(count):
+            length, pos = _get_varint(buf, pos)
+            symbols.append(buf[pos:pos + length].decode('utf-8'))
+            pos += length
+        self.symbols = symbols
+
+        self.string_count, pos = _get_varint(buf, pos)
+        self._offsets = pos
+        self._blob = pos + 4 * self.string_count
+        if self.string_count:
+            pos = self._blob + self._string_end(self.string_count - 1)
+        else:
+            pos = self._blob
+        self._strings = {}
+
+        self.node_count, self.root_offset = _get_varint(buf, pos)
+
+    def _string_end(self, i):
+        at = self._offsets + 4 * i
+        return int.from_bytes(self.buf[at:at + 4], 'little')
+
+    def string(self, string_id):
+        # Lexeme by pool index, decoded once
+        value = self._strings.get(string_id)
+        if value is None:
+            start = self._string_end(string_id - 1) if string_id else 0
+            end = self._string_end(string_id)
+            value = self._strings[string_id] = self.buf[self._blob + start:self._blob + end].decode('utf-8')
+        return value
+
+    def strings(self):
+        # The whole pool, decoded in one pass
+        ends = array('I')
+        ends.frombytes(self.buf[self._offsets:self._blob])
+        if sys.byteorder == 'big':
+            ends.byteswap()
+        blob = self.buf[self._blob:self._blob + (ends[-1] if ends else 0)]
+        return [blob[start:end].decode('utf-8') for start, end in zip(chain((0,), ends), ends)]
+
+    @property
+    def root(self):
+        return TreeNode(self, self.root_offset)
+
+    def iter_preorder(self):
+        # Decode the whole file front to back, yielding (depth, symbol,
+        # value) with value None for non-terminals; no node objects are made
+        buf, symbols, string = self.buf, self.symbols, self.string
+        pos = self.root_offset
+        remaining = [1]  # children still to come at each open level
+        for _ in range(self.node_count):
+            while not remaining[-1]:
+                remaining.pop()
+            remaining[-1] -= 1
+            depth = len(remaining) - 1
+            head, pos = _get_varint(buf, pos)
+            arg, pos = _get_varint(buf, pos)
+            if head & 1:
+                yield depth, symbols[head >> 1], string(arg - 1) if arg else None
+            else:
+                _, pos = _get_varint(buf, pos)
+                yield depth, symbols[head >> 1], None
+                remaining.append(arg)
+
+    def close(self):
+        self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TreeNode:
+    # Read-only dict-style view of one node of a TreeReader, like
+    # trees.FlatNode, decoding its header on first use
+    __slots__ = ('reader', 'offset', '_head', '_arg', '_body', '_end')
+
+    def __init__(self, reader, offset):
+        self.reader = reader
+        self.offset = offset
+        self._head = None
+
+    def _decode(self):
+        buf = self.reader.buf
+        self._head, pos = _get_varint(buf, self.offset)
+        self._arg, pos = _get_varint(buf, pos)
+        if self._head & 1:
+            self._body = self._end = pos
+        else:
+            length, pos = _get_varint(buf, pos)
+            self._body = pos
+            self._end = pos + length
+
+    def __getitem__(self, key):
+        if self._head is None:
+            self._decode()
+        terminal = self._head & 1
+        if key == 'symbol':
+            return self.reader.symbols[self._head >> 1]
+        if key == 'type':
+            return 'terminal' if terminal else 'non-terminal'
+        if key == 'children':
+            if terminal:
+                return []
+            children = []
+            pos = self._body
+            for _ in range(self._arg):
+                child = TreeNode(self.reader, pos)
+                child._decode()
+                children.append(child)
+                pos = child._end
+            return children
+        if key == 'value' and terminal:
+            return self.reader.string(self._arg - 1) if self._arg else None
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == 'value':
+            return self['type'] == 'terminal'
+        return key in ('type', 'symbol', 'children')
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"TreeNode({self['symbol']!r}, offset={self.offset})"
+
+
+def load_tree(path):
+    # Decode a whole file back into nested dicts, as LALR.run builds them
+    with TreeReader(path) as reader:
+        symbols, strings = reader.symbols, reader.strings()
+        # Everything is read, so one copy out of the map is cheaper than
+        # indexing it byte by byte
+        buf = reader.buf[reader.root_offset:]
+        count = reader.node_count
+
+    # Every node stays alive, so the collections its allocations would
+    # trigger cannot free anything
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        pos = 0
+        root = None
+        open_nodes = []  # [children list, children still to come]
+        for _ in range(count):
+            # Most varints are one byte; only longer ones take the call
+            head = buf[pos]
+            if head < 0x80:
+                pos += 1
+            else:
+                head, pos = _get_varint(buf, pos)
+            arg = buf[pos]
+            if arg < 0x80:
+                pos += 1
+            else:
+                arg, pos = _get_varint(buf, pos)
+
+            if head & 1:
+                node = {'type': 'terminal', 'symbol': symbols[head >> 1],
+                        'value': strings[arg - 1] if arg else None, 'children': []}
+            else:
+                # Skip the byte length, which only lazy readers need
+                while buf[pos] >= 0x80:
+                    pos += 1
+                pos += 1
+                node = {'type': 'non-terminal', 'symbol': symbols[head >> 1], 'children': []}
+
+            if open_nodes:
+                parent = open_nodes[-1]
+                parent[0].append(node)
+                parent[1] -= 1
+                if not parent[1]:
+                    open_nodes.pop()
+            else:
+                root = node
+            if not head & 1 and arg:
+                open_nodes.append([node['children'], arg])
+        return root
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def write_json(root, out):
+    # Stream a dict-style tree to a text file as nested JSON objects of the
+    # same shape as the dict tree, without recursion or building the text
+    # in memory
+    write = out.write
+    dumps = json.dumps
+    # Each entry is the iterator over the children of an open node
+    pending = [iter((root,))]
+    first = [True]
+    while pending:
+        node = next(pending[-1], None)
+        if node is None:
+            pending.pop()
+            first.pop()
+            if pending:
+                write(']}')
+            continue
+        if not first[-1]:
+            write(', ')
+        first[-1] = False
+        symbol = dumps(node['symbol'])
+        if node['type'] == 'terminal':
+            write(f'{{"type": "terminal", "symbol": {symbol}, "value": {dumps(node.get("value"))}, "children": []}}')
+        else:
+            write(f'{{"type": "non-terminal", "symbol": {symbol}, "children": [')
+            pending.append(iter(node['children']))
+            first.append(True)
+    write('\n')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Convert parse trees to the binary tree format or JSON.")
+    arg_parser.add_argument('input', help="program source, or a tree file written by this tool")
+    arg_parser.add_argument('-o', '--output', help="binary tree file to write")
+    arg_parser.add_argument('--json', metavar='PATH', help="also export the tree as JSON ('-' for stdout)")
+    args = arg_parser.parse_args()
+
+    with open(args.input, 'rb') as f:
+        is_tree = f.read(len(MAGIC)) == MAGIC
+
+    reader = None
+    if is_tree:
+        reader = TreeReader(args.input)
+        tree = reader.root
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            tokens, lexems = tokenize(f.read())
+        tree, _ = LALR(Grammar()).run(tokens, lexems, tree='flat')
+
+    try:
+        if args.output:
+            size = write_tree(tree, args.output)
+            print(f"Wrote {args.output} ({size:,} bytes)", file=sys.stderr)
+        if args.json == '-':
+            write_json(tree, sys.stdout)
+        elif args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                write_json(tree, f)
+            print(f"Wrote {args.json} ({os.path.getsize(args.json):,} bytes)", file=sys.stderr)
+    finally:
+        if reader is not None:
+            reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+from array import array
+
+# Tree builders receive the parser's shift and reduce steps. The driver in
+# LALR.run calls shift(index, symbol, value) for every terminal and
+# reduce(lhs, n) when the last n nodes become the children of lhs, then
+# takes the root from result().
+
+
+class DictTreeBuilder:
+    # Nested dicts with 'type', 'symbol', 'value' and 'children' keys
+    def __init__(self):
+        self.nodes = []
+
+    def shift(self, index, symbol, value):
+        self.nodes.append({
+            'type': 'terminal',
+            'symbol': symbol,
+            'value': value,
+            'children': []
+        })
+
+    def reduce(self, lhs, n):
+        nodes = self.nodes
+        if n:
+            children = nodes[-n:]
+            del nodes[-n:]
+        else:
+            children = []
+        nodes.append({
+            'type': 'non-terminal',
+            'symbol': lhs,
+            'children': children
+        })
+
+    def result(self):
+        return self.nodes[-1]
+
+
+class FlatTree:
+    # Parse tree stored as parallel arrays indexed by node id: interned
+    # symbol id, first child, next sibling and token index (-1 for
+    # non-terminals). Lexemes are looked up by token index on demand.
+    def __init__(self, symbols, lexems):
+        self.symbols = symbols
+        self.lexems = lexems
+        self.symbol = array('H')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.token = array('i')
+        self.root_id = -1
+
+    def __len__(self):
+        return len(self.symbol)
+
+    @property
+    def root(self):
+        return FlatNode(self, self.root_id)
+
+    def node(self, node_id):
+        return FlatNode(self, node_id)
+
+    def children_ids(self, node_id):
+        child = self.first_child[node_id]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def memory_usage(self):
+        # Bytes held by the node arrays
+        return sum(len(buf) * buf.itemsize
+                   for buf in (self.symbol, self.first_child, self.next_sibling, self.token))
+
+
+class FlatNode:
+    # Read-only dict-style view of one FlatTree node, so code written for
+    # dict trees (print_parse_tree, visualize_parse_tree) works unchanged
+    __slots__ = ('tree', 'id')
+
+    def __init__(self, tree, node_id):
+        self.tree = tree
+        self.id = node_id
+
+    def __getitem__(self, key):
+        tree = self.tree
+        if key == 'symbol':
+            return tree.symbols[tree.symbol[self.id]]
+        if key == 'type':
+            return 'terminal' if tree.token[self.id] >= 0 else 'non-terminal'
+        if key == 'children':
+            return [FlatNode(tree, child) for child in tree.children_ids(self.id)]
+        if key == 'value' and tree.token[self.id] >= 0:
+            symbol = tree.symbols[tree.symbol[self.id]]
+            return tree.lexems.get(tree.token[self.id], symbol)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == 'value':
+            return self.tree.token[self.id] >= 0
+        return key in ('type', 'symbol', 'children')
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        return isinstance(other, FlatNode) and other.tree is self.tree and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.tree), self.id))
+
+    def __repr__(self):
+        return f"FlatNode({self['symbol']!r}, id={self.id})"
+
+
+class FlatTreeBuilder:
+    def __init__(self, grammar, lexems=None):
+        # Without a lexems dict (tokens streamed from the scanner) the
+        # builder records the values it is given
+        symbols = sorted(grammar.terminals) + sorted(grammar.non_terminals)
+        self.symbol_ids = {symbol: idx for idx, symbol in enumerate(symbols)}
+        self.values = {} if lexems is None else None
+        self.tree = FlatTree(symbols, lexems if lexems is not None else self.values)
+        self.stack = []
+
+    def shift(self, index, symbol, value):
+        if self.values is not None:
+            self.values[index] = value
+        tree = self.tree
+        self.stack.append(len(tree.symbol))
+        tree.symbol.append(self.symbol_ids[symbol])
+        tree.first_child.append(-1)
+        tree.next_sibling.append(-1)
+        tree.token.append(index)
+
+    def reduce(self, lhs, n):
+        tree = self.tree
+        stack = self.stack
+        node_id = len(tree.symbol)
+        first = -1
+        if n:
+            children = stack[-n:]
+            del stack[-n:]
+            first = children[0]
+            next_sibling = tree.next_sibling
+            for left, right in zip(children, children[1:]):
+                next_sibling[left] = right
+
+        stack.append(node_id)
+        tree.symbol.append(self.symbol_ids[lhs])
+        tree.first_child.append(first)
+        tree.next_sibling.append(-1)
+        tree.token.append(-1)
+
+    def result(self):
+        # The root is returned as a FlatNode view; root.tree holds the arrays
+        self.tree.root_id = self.stack[-1]
+        return self.tree.root
+
@@ -1,12 +1,16 @@
-from graphviz import Digraph
-
 def visualize_parse_tree(parse_tree):
+    from graphviz import Digraph
+
     dot = Digraph(format='png', engine="dot")
-    node_count = [0]
+    node_count = 0
 
-    def add_nodes_edges(node, parent_id=None):
-        node_id = f"node{node_count[0]}"
-        node_count[0] += 1
+    # Walk with an explicit stack; S -> S St makes trees as deep as the
+    # program is long
+    stack = [(parse_tree, None)]
+    while stack:
+        node, parent_id = stack.pop()
+        node_id = f"node{node_count}"
+        node_count += 1
 
         # Determine label
         if node['type'] == 'terminal':
@@ -19,8 +23,117 @@ def visualize_parse_tree(parse_tree):
         if parent_id:
             dot.edge(parent_id, node_id)
 
-        for child in node.get('children', []):
-            add_nodes_edges(child, node_id)
+        for child in reversed(node.get('children', [])):
+            stack.append((child, node_id))
 
-    add_nodes_edges(parse_tree)
     return dot
+
+
+def _quote(text):
+    text = str(text).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{text}"'
+
+
+def write_dot(parse_tree, out, collapse_chains=False, max_depth=None, max_nodes=None, elide=()):
+    # Stream the tree as DOT text to `out` (a path or a text file object)
+    # without building a graph in memory. Options:
+    #   collapse_chains  splice a child into its parent when both have the
+    #                    same symbol, so the S -> S St chain becomes one S
+    #                    with all statements as children
+    #   max_depth        replace children below this depth with a "..." node
+    #   max_nodes        stop after this many nodes, marking where the
+    #                    remaining ones would go
+    #   elide            symbols (or a predicate on nodes) whose subtrees are
+    #                    drawn as a single "symbol ..." node
+    # Returns the number of nodes written.
+    if isinstance(out, str):
+        with open(out, 'w', encoding='utf-8') as f:
+            return write_dot(parse_tree, f, collapse_chains, max_depth, max_nodes, elide)
+
+    if callable(elide):
+        is_elided = elide
+    else:
+        elided = frozenset(elide)
+        def is_elided(node):
+            return node['symbol'] in elided
+
+    write = out.write
+    write('digraph {\n')
+    count = 0
+    truncated = False
+
+    # (node, parent id, depth)
+    stack = [(parse_tree, None, 0)]
+    while stack:
+        node, parent_id, depth = stack.pop()
+        if max_nodes is not None and count >= max_nodes:
+            truncated = True
+            break
+
+        node_id = f"n{count}"
+        count += 1
+        children = node.get('children', [])
+
+        if node['type'] == 'terminal':
+            label = f"{node['symbol']}\n{node['value']}"
+        elif children and is_elided(node):
+            label = f"{node['symbol']} ..."
+            children = ()
+        else:
+            label = node['symbol']
+        write(f'\t{node_id} [label={_quote(label)}]\n')
+        if parent_id is not None:
+            write(f'\t{parent_id} -> {node_id}\n')
+
+        if not children:
+            continue
+        if max_depth is not None and depth >= max_depth:
+            write(f'\t{node_id}_more [label="..." shape=plaintext]\n')
+            write(f'\t{node_id} -> {node_id}_more [style=dashed]\n')
+            continue
+
+        if collapse_chains:
+            # Unwind the left spine of same-symbol nodes, collecting their
+            # right siblings from the bottom of the chain upwards
+            symbol = node['symbol']
+            spliced = []
+            while children and children[0]['type'] != 'terminal' and children[0]['symbol'] == symbol:
+                spliced.append(children[1:])
+                children = children[0]['children']
+            if spliced:
+                children = list(children)
+                for rest in reversed(spliced):
+                    children.extend(rest)
+
+        for child in reversed(children):
+            stack.append((child, node_id, depth + 1))
+
+    if truncated:
+        write(f'\ttruncated [label="... {len(stack) + 1} more subtrees" shape=plaintext]\n')
+    write('}\n')
+    return count
+
+
+class DotProcess:
+    # A Graphviz run started by render_dot. wait() returns (ok, error),
+    # error being the engine's message when it failed
+    def __init__(self, process):
+        self.process = process
+
+    def wait(self):
+        # communicate() keeps draining stderr, so an engine printing more
+        # warnings than a pipe holds cannot block
+        _, errors = self.process.communicate()
+        if self.process.returncode != 0:
+            return False, errors.decode(errors='replace').strip() or f"exit status {self.process.returncode}"
+        return True, None
+
+
+def render_dot(dot_path, output_path, format='png', engine='dot'):
+    # Start Graphviz on a DOT file in the background and return a
+    # DotProcess; call its wait() to collect the result. Raises OSError if
+    # the engine cannot be started.
+    import subprocess
+
+    return DotProcess(subprocess.Popen([engine, f'-T{format}', dot_path, '-o', output_path],
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE))